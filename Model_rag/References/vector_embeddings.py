@@ -1,7 +1,57 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from typing import List, Union
+import numpy as np
+import torch
 from haystack.dataclasses import Document
+from haystack.utils import ComponentDevice
 from haystack.components.embedders import SentenceTransformersTextEmbedder, SentenceTransformersDocumentEmbedder
 
+# One embedding process per GPU, started on the first multi-GPU embed_many() call
+_GPU_POOL = None
+_GPU_POOL_SIZE = 0
+# The embedder owned by a pool worker process
+_WORKER_EMBEDDER = None
+
+
+def _init_gpu_worker(device_ids, model_name):
+    """Pins the worker to one GPU before torch touches CUDA, then loads the model once."""
+    global _WORKER_EMBEDDER
+    os.environ["CUDA_VISIBLE_DEVICES"] = str(device_ids.get())
+    _WORKER_EMBEDDER = HaystackEmbeddingGenerator(model_name=model_name)
+
+
+def _embed_shard(texts):
+    """
+    Embeds one shard in a worker and hands the result back through shared memory,
+    so only the block name and shape are pickled instead of the vectors.
+    """
+    embeddings = np.asarray(_WORKER_EMBEDDER.embed(texts), dtype=np.float32)
+    block = shared_memory.SharedMemory(create=True, size=embeddings.nbytes)
+    np.ndarray(embeddings.shape, dtype=np.float32, buffer=block.buf)[:] = embeddings
+    block.close()
+    return block.name, embeddings.shape
+
+
+def _get_gpu_pool(model_name):
+    global _GPU_POOL, _GPU_POOL_SIZE
+    if _GPU_POOL is None:
+        # CUDA cannot be used in a forked child, so workers are spawned
+        context = multiprocessing.get_context("spawn")
+        device_ids = context.Queue()
+        _GPU_POOL_SIZE = torch.cuda.device_count()
+        for device_id in range(_GPU_POOL_SIZE):
+            device_ids.put(device_id)
+        _GPU_POOL = ProcessPoolExecutor(
+            max_workers=_GPU_POOL_SIZE,
+            mp_context=context,
+            initializer=_init_gpu_worker,
+            initargs=(device_ids, model_name)
+        )
+    return _GPU_POOL, _GPU_POOL_SIZE
+
 
 class HaystackEmbeddingGenerator:
     """
@@ -13,9 +63,30 @@ class HaystackEmbeddingGenerator:
         Initializes the generator and pre-loads the Haystack embedder components.
         """
         print(f"Initializing Haystack embedders with model: {model_name}...")
-        
-        self.text_embedder = SentenceTransformersTextEmbedder(model=model_name)        
-        self.doc_embedder = SentenceTransformersDocumentEmbedder(model=model_name)
+        self.model_name = model_name
+
+        # Prefer the GPU when there is one; half precision only pays off there.
+        # safetensors weights are memory-mapped, so several processes share one page-cached copy.
+        device = ComponentDevice.resolve_device(None)
+        model_kwargs = {"use_safetensors": True, "low_cpu_mem_usage": True}
+        if torch.cuda.is_available():
+            model_kwargs["torch_dtype"] = torch.float16
+        batch_size = int(os.getenv("EMBED_BATCH", "64"))
+
+        self.text_embedder = SentenceTransformersTextEmbedder(
+            model=model_name,
+            device=device,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            model_kwargs=model_kwargs
+        )
+        self.doc_embedder = SentenceTransformersDocumentEmbedder(
+            model=model_name,
+            device=device,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            model_kwargs=model_kwargs
+        )
         
         # Warm up the components to load the model into memory
         self.text_embedder.warm_up()
@@ -44,6 +115,30 @@ class HaystackEmbeddingGenerator:
         else:
             raise TypeError("Input must be a string or a list of strings.")
 
+    def embed_many(self, texts: List[str]):
+        """
+        Embeds a large list of texts, spread over every GPU on the machine.
+        Text i goes to worker i % n_gpus, so each worker gets an even share.
+        Falls back to embed() on machines with fewer than two GPUs.
+
+        :param texts: A list of strings to be embedded.
+        :return: A list of vectors, in the same order as `texts`.
+        """
+        if torch.cuda.device_count() < 2 or len(texts) < 2:
+            return self.embed(texts)
+
+        pool, workers = _get_gpu_pool(self.model_name)
+        shards = [texts[i::workers] for i in range(workers) if texts[i::workers]]
+        results = list(pool.map(_embed_shard, shards))
+
+        embeddings = np.empty((len(texts), results[0][1][1]), dtype=np.float32)
+        for i, (name, shape) in enumerate(results):
+            block = shared_memory.SharedMemory(name=name)
+            embeddings[i::workers] = np.ndarray(shape, dtype=np.float32, buffer=block.buf)
+            block.close()
+            block.unlink()
+        return embeddings.tolist()
+
 
 if __name__ == "__main__":
     embedder = HaystackEmbeddingGenerator()
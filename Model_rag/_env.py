@@ -0,0 +1,44 @@
+# _env.py
+# Loads .env once per process and exposes the settings Model_rag reads, parsed to their types.
+# Import the constants from here instead of calling load_dotenv()/os.getenv on request paths.
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY")
+
+# pgvector HNSW index; higher values trade speed for recall
+HNSW_M: int = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+HNSW_EF_SEARCH: int = int(os.getenv("HNSW_EF_SEARCH", "40"))
+
+# "onnx" runs bge-m3 through ONNX Runtime from the export in EMBEDDING_ONNX_PATH
+# (see Model_rag/export_onnx.py): FP32 for documents, dynamic int8 for questions
+EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_PATH: str = os.getenv("EMBEDDING_ONNX_PATH", "models/bge-m3-onnx")
+# Chunks per embedding forward pass and per INSERT ... ON CONFLICT executemany
+EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH", "64"))
+WRITE_BATCH_SIZE: int = int(os.getenv("WRITE_BATCH_SIZE", "500"))
+# Concurrent questions are embedded together: up to QUERY_BATCH_SIZE per forward pass,
+# waiting at most QUERY_BATCH_WAIT_MS for the batch to fill
+QUERY_BATCH_SIZE: int = int(os.getenv("QUERY_BATCH_SIZE", "16"))
+QUERY_BATCH_WAIT_MS: float = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+
+# How many candidates per final document the retriever fetches for exact re-ranking
+RERANK_OVERSAMPLE: int = int(os.getenv("RERANK_OVERSAMPLE", "1"))
+# "binary": coarse search over binary-quantized embeddings, then re-scoring of
+# QUANTIZED_CANDIDATES rows; needs Model_rag/sql/binary_quantize_index.sql applied
+QUANTIZED_RETRIEVAL: str = os.getenv("QUANTIZED_RETRIEVAL", "")
+QUANTIZED_CANDIDATES: int = int(os.getenv("QUANTIZED_CANDIDATES", "200"))
+
+# Summaries: documents longer than SUMMARY_CHUNK_CHARS are summarized in parts, then the parts
+# are summarized together; at most SUMMARY_CONCURRENCY summary requests run at once
+SUMMARY_CHUNK_CHARS: int = int(os.getenv("SUMMARY_CHUNK_CHARS", "16000"))
+SUMMARY_CONCURRENCY: int = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+
+# Answer cache (SemanticCache): ANSWER_CACHE_SIZE entries, reused above SEMANTIC_CACHE_THRESHOLD cosine
+EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_PATH: str = os.getenv("SEMANTIC_CACHE_PATH")
@@ -0,0 +1,74 @@
+# batch_retriever.py
+from typing import List
+from haystack import component
+from haystack.dataclasses import Document
+from haystack.document_stores.errors import DocumentStoreError
+from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
+from psycopg import Error
+from psycopg.sql import SQL, Identifier, Literal as SQLLiteral
+from Model_rag.document_store import get_connection, rows_to_documents
+
+# (score expression, distance to ORDER BY, best-first direction of score) per vector function,
+# matching PgvectorDocumentStore's own scoring
+_SCORE_SQL = {
+    "cosine_similarity": ("1 - (embedding <=> q.v)", "embedding <=> q.v", "DESC"),
+    "inner_product": ("(embedding <#> q.v) * -1", "embedding <#> q.v", "DESC"),
+    "l2_distance": ("embedding <-> q.v", "embedding <-> q.v", "ASC"),
+}
+
+
+@component
+class BatchPgvectorRetriever:
+    """
+    Retrieves the top_k documents for several query embeddings with a single SQL statement.
+
+    The query embeddings are unnested into a derived table and each one drives a LATERAL
+    subquery that uses the table's vector index, so N questions cost one round trip and
+    one parse/plan instead of N.
+    Only the store's public settings (table, vector type and function) are read; the query
+    runs on this thread's get_connection().
+    """
+    def __init__(self, document_store: PgvectorDocumentStore, top_k: int = 10):
+        self.document_store = document_store
+        self.top_k = top_k
+
+    @component.output_types(documents=List[List[Document]])
+    def run(self, query_embeddings: List[List[float]]):
+        """
+        :param query_embeddings: One embedding per question.
+        :return: For each query embedding, in input order, its documents ordered best first.
+        """
+        if not query_embeddings:
+            return {"documents": []}
+
+        store = self.document_store
+        score, order_by, direction = _SCORE_SQL[store.vector_function]
+        sql_query = SQL(
+            "SELECT q.qid, s.id, s.content, s.meta, s.embedding::real[] AS embedding, s.score "
+            "FROM unnest(%s::text[]) WITH ORDINALITY AS t(v_text, qid) "
+            "CROSS JOIN LATERAL (SELECT t.v_text::{vector_type} AS v) AS q "
+            "CROSS JOIN LATERAL ("
+            "SELECT id, content, meta, embedding, {score} AS score FROM {schema_name}.{table_name} "
+            "ORDER BY {order_by} ASC LIMIT {top_k}"
+            ") AS s "
+            "ORDER BY q.qid, s.score {direction}"
+        ).format(
+            vector_type=SQL(store.vector_type),
+            score=SQL(score),
+            schema_name=Identifier(store.schema_name),
+            table_name=Identifier(store.table_name),
+            order_by=SQL(order_by),
+            top_k=SQLLiteral(self.top_k),
+            direction=SQL(direction),
+        )
+        vectors = ["[" + ",".join(str(value) for value in embedding) + "]" for embedding in query_embeddings]
+
+        try:
+            records = get_connection().execute(sql_query, (vectors,)).fetchall()
+        except Error as e:
+            raise DocumentStoreError("Could not batch retrieve documents from PgvectorDocumentStore") from e
+
+        grouped = [[] for _ in query_embeddings]
+        for record in records:
+            grouped[record["qid"] - 1].append(record)
+        return {"documents": [rows_to_documents(rows) for rows in grouped]}
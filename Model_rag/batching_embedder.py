@@ -0,0 +1,78 @@
+# batching_embedder.py
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List
+from haystack import component
+from haystack.dataclasses import Document
+
+
+@component
+class BatchingTextEmbedder:
+    """
+    Text embedder that coalesces concurrent calls into one forward pass.
+
+    Each request thread queues its text and waits; a single worker thread takes whatever
+    is queued, waits up to `max_wait_ms` for more (at most `max_batch_size` texts), embeds
+    them together with the wrapped document embedder and hands every caller its row.
+    A batch of 16 costs about the same as a batch of 1, so under concurrent questions
+    throughput grows with the realized batch size for at most `max_wait_ms` extra latency.
+    """
+    def __init__(self, embedder, max_batch_size: int = 16, max_wait_ms: float = 5):
+        # A SentenceTransformersDocumentEmbedder: it embeds a list of texts in one call
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._reset()
+        # Threads do not survive fork (gunicorn preload_app); start a new worker in the child
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def warm_up(self):
+        if hasattr(self.embedder, "warm_up"):
+            self.embedder.warm_up()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._serve, name="query-embedder", daemon=True)
+                    self._worker.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _serve(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                documents = self.embedder.run(documents=[Document(content=text) for text, _ in batch])["documents"]
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for document, (_, future) in zip(documents, batch):
+                future.set_result(document.embedding)
+
+    @component.output_types(embedding=List[float])
+    def run(self, text: str):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        return {"embedding": future.result()}
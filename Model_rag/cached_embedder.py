@@ -0,0 +1,43 @@
+# cached_embedder.py
+import threading
+from collections import OrderedDict
+from typing import List
+import numpy as np
+from haystack import component
+
+
+@component
+class CachedTextEmbedder:
+    """
+    Wraps a text embedder and remembers the embeddings of recent texts, so a repeated
+    question skips the bge-m3 forward pass. Texts are keyed after collapsing whitespace;
+    the least recently used embedding is dropped once `max_size` are held.
+    """
+    def __init__(self, embedder, max_size: int = 10000):
+        self.embedder = embedder
+        self.max_size = max_size
+        # float32 arrays rather than lists of Python floats: 4 KB per entry instead of ~32 KB
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        if hasattr(self.embedder, "warm_up"):
+            self.embedder.warm_up()
+
+    @component.output_types(embedding=List[float])
+    def run(self, text: str):
+        key = " ".join(text.split())
+        with self._lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+                return {"embedding": embedding.tolist()}
+
+        embedding = self.embedder.run(text=key)["embedding"]
+        if self.max_size > 0:
+            with self._lock:
+                self._cache[key] = np.asarray(embedding, dtype=np.float32)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+        return {"embedding": embedding}
@@ -0,0 +1,77 @@
+# document_store.py
+import threading
+from typing import List
+import psycopg
+from psycopg.rows import dict_row
+from psycopg.sql import SQL, Literal as SQLLiteral
+from haystack.dataclasses import Document
+from haystack.utils import Secret
+from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
+from Model_rag._env import HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+
+TABLE_NAME = "document_sections_embeddings"
+EMBEDDING_DIMENSION = 1024
+
+# One store per thread: a PgvectorDocumentStore owns a single psycopg connection and
+# reuses its cursors, which must not be shared by the request threads of a gthread worker
+_LOCAL = threading.local()
+
+
+def get_document_store():
+    """
+    Returns this thread's PgvectorDocumentStore, creating it on first use.
+
+    The store keeps its Postgres connection open between calls, so each thread reuses one
+    connection instead of reconnecting for every document or question. A worker therefore
+    holds at most one connection per request thread (GUNICORN_THREADS).
+
+    Embeddings are L2-normalized when they are written and when questions are embedded,
+    so inner product ranks exactly like cosine similarity without the per-row norms.
+    Embeddings are stored as halfvec (16-bit, 2 KB per row), which halves the bytes every
+    search reads. Searches go through an HNSW index (halfvec_ip_ops), created on first use
+    if it is missing, instead of an exact scan over the whole table.
+    """
+    document_store = getattr(_LOCAL, "document_store", None)
+    if document_store is None:
+        document_store = PgvectorDocumentStore(
+            connection_string=Secret.from_env_var("CONN_STR"),
+            table_name=TABLE_NAME,
+            embedding_dimension=EMBEDDING_DIMENSION,
+            vector_type="halfvec",
+            vector_function="inner_product",
+            search_strategy="hnsw",
+            hnsw_index_name="dse_ip_idx",
+            hnsw_index_creation_kwargs={"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION},
+            hnsw_ef_search=HNSW_EF_SEARCH
+        )
+        _LOCAL.document_store = document_store
+    return document_store
+
+
+def get_connection() -> psycopg.Connection:
+    """
+    Returns this thread's own Postgres connection for the custom retrievers, opening it on first use.
+
+    BatchPgvectorRetriever and QuantizedRetriever run their own SQL. They use this connection
+    rather than the store's, whose connection and helpers are private to pgvector-haystack and
+    change between its releases. Like the store, it is per thread, in autocommit mode, and has
+    hnsw.ef_search set to HNSW_EF_SEARCH for the session; rows come back as dicts.
+    """
+    connection = getattr(_LOCAL, "connection", None)
+    if connection is None or connection.closed:
+        connection = psycopg.connect(Secret.from_env_var("CONN_STR").resolve_value(), autocommit=True, row_factory=dict_row)
+        connection.execute(SQL("SET hnsw.ef_search = {ef_search}").format(ef_search=SQLLiteral(HNSW_EF_SEARCH)))
+        _LOCAL.connection = connection
+    return connection
+
+
+def rows_to_documents(rows) -> List[Document]:
+    """
+    Builds Documents from rows of the embeddings table.
+
+    Each row needs id, content, meta (jsonb), embedding (selected as real[]) and score.
+    """
+    return [
+        Document(id=row["id"], content=row["content"], meta=row["meta"] or {}, score=row["score"], embedding=row["embedding"])
+        for row in rows
+    ]
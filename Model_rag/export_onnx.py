@@ -0,0 +1,14 @@
+# export_onnx.py
+# One-time export of bge-m3 for EMBEDDING_BACKEND=onnx:
+#   python -m Model_rag.export_onnx
+# Writes onnx/model.onnx (FP32, used for documents) and onnx/model_qint8_avx512_vnni.onnx
+# (dynamic int8, used for questions) under EMBEDDING_ONNX_PATH.
+from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+from Model_rag._env import EMBEDDING_ONNX_PATH
+
+if __name__ == "__main__":
+    print(f"Exporting BAAI/bge-m3 to ONNX in {EMBEDDING_ONNX_PATH}...")
+    model = SentenceTransformer("BAAI/bge-m3", backend="onnx")
+    model.save_pretrained(EMBEDDING_ONNX_PATH)
+    export_dynamic_quantized_onnx_model(model, "avx512_vnni", EMBEDDING_ONNX_PATH)
+    print("Export complete.")
@@ -1,64 +1,165 @@
 # index.py
 import os
-from dotenv import load_dotenv
+import mmap
+import threading
 from haystack import Pipeline
 from haystack.dataclasses import Document
 from haystack.components.writers import DocumentWriter
 from haystack.document_stores.types import DuplicatePolicy
-from haystack.components.preprocessors import DocumentSplitter
 from haystack.components.embedders import SentenceTransformersDocumentEmbedder
-from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
-from haystack.utils import Secret
+from Model_rag._env import EMBEDDING_BACKEND, EMBEDDING_ONNX_PATH, EMBED_BATCH_SIZE, WRITE_BATCH_SIZE
+from Model_rag.document_store import get_document_store
+from Model_rag.splitter import FastSentenceSplitter
 
-def index_document(parent_doc_id: str, document_content: str):
+if EMBEDDING_BACKEND == "onnx":
+    EMBEDDING_MODEL_NAME = EMBEDDING_ONNX_PATH
+    # Documents keep full precision for corpus recall; questions use the int8 model,
+    # whose embeddings are only compared against the FP32 corpus vectors
+    EMBEDDING_MODEL_KWARGS = {"file_name": "onnx/model.onnx"}
+    QUERY_EMBEDDING_MODEL_KWARGS = {"file_name": "onnx/model_qint8_avx512_vnni.onnx"}
+else:
+    EMBEDDING_MODEL_NAME = "BAAI/bge-m3"
+    # Load bge-m3 from its safetensors file, which is memory-mapped: processes on the same host
+    # share the page-cached weights and the load skips the intermediate full-size CPU copy
+    EMBEDDING_MODEL_KWARGS = {"use_safetensors": True, "low_cpu_mem_usage": True}
+    QUERY_EMBEDDING_MODEL_KWARGS = EMBEDDING_MODEL_KWARGS
+
+# Read size when paging model files into the OS page cache
+PREWARM_STRIDE = 4 * 1024 * 1024
+
+_INDEXING_PIPELINE = None
+_INDEXING_PIPELINE_LOCK = threading.Lock()
+
+
+def _get_indexing_pipeline():
+    """
+    Builds the splitter -> embedder pipeline once and reuses it.
+
+    Warming up here loads bge-m3 a single time per process instead of on every indexing call.
+    Chunks are written by _write_chunks rather than a writer component, because the
+    document store (and its connection) belongs to the calling thread.
+    """
+    global _INDEXING_PIPELINE
+    if _INDEXING_PIPELINE is None:
+        with _INDEXING_PIPELINE_LOCK:
+            if _INDEXING_PIPELINE is None:
+                indexing_pipeline = Pipeline()
+                indexing_pipeline.add_component("splitter", FastSentenceSplitter(split_length=6, split_overlap=2))
+                indexing_pipeline.add_component("embedder", SentenceTransformersDocumentEmbedder(model=EMBEDDING_MODEL_NAME, batch_size=EMBED_BATCH_SIZE, normalize_embeddings=True, backend=EMBEDDING_BACKEND, model_kwargs=EMBEDDING_MODEL_KWARGS))
+                indexing_pipeline.connect("splitter.documents", "embedder.documents")
+                indexing_pipeline.warm_up()
+                _INDEXING_PIPELINE = indexing_pipeline
+    return _INDEXING_PIPELINE
+
+
+def _write_chunks(chunks: list[Document], batch_size: int = WRITE_BATCH_SIZE):
+    """Writes embedded chunks through this thread's document store, `batch_size` rows per INSERT."""
+    # Each write is one executemany INSERT ... ON CONFLICT DO UPDATE and one commit;
+    # batching only bounds the statement size for very long documents
+    writer = DocumentWriter(document_store=get_document_store(), policy=DuplicatePolicy.OVERWRITE)
+    for start in range(0, len(chunks), batch_size):
+        writer.run(documents=chunks[start:start + batch_size])
+
+
+def _model_files() -> list[str]:
+    """Paths of the bge-m3 weight files this process will load, where they are already on disk."""
+    if EMBEDDING_BACKEND == "onnx":
+        paths = [os.path.join(EMBEDDING_ONNX_PATH, kwargs["file_name"]) for kwargs in (EMBEDDING_MODEL_KWARGS, QUERY_EMBEDDING_MODEL_KWARGS)]
+        # Large ONNX exports keep their weights in a separate external-data file
+        paths += [path + "_data" for path in paths]
+    else:
+        from huggingface_hub import try_to_load_from_cache
+        paths = [try_to_load_from_cache(EMBEDDING_MODEL_NAME, "model.safetensors")]
+    return list(dict.fromkeys(path for path in paths if isinstance(path, str) and os.path.isfile(path)))
+
+
+def _page_in(path: str):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, "MADV_WILLNEED"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+                mm.madvise(mmap.MADV_WILLNEED)
+            for start in range(0, len(mm), PREWARM_STRIDE):
+                mm[start:start + PREWARM_STRIDE]
+
+
+def prewarm_model_files():
+    """
+    Reads the bge-m3 weight files into the OS page cache on a background thread.
+
+    The first model load otherwise demand-pages ~2 GB from disk while a request waits.
+    The page cache is shared, so with gunicorn's preload_app the master warms it once for every worker.
+    """
+    def run():
+        for path in _model_files():
+            try:
+                _page_in(path)
+            except OSError as e:
+                print(f"Could not prewarm {path}: {e}")
+
+    threading.Thread(target=run, name="prewarm-model-files", daemon=True).start()
+
+
+def load_sample_document() -> str:
+    """Reads the sample KMRL SOP used by the __main__ test blocks from Model_rag/data."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "kmrl_sop_068.txt")
+    with open(path, "rb") as f:
+        # Map the file instead of reading it into a buffer; the pages stay shared in the OS page cache
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[:].decode("utf-8")
+
+
+def index_documents(documents: list[dict], batch_size: int = 500):
+    """
+    Chunks, embeds, and indexes many documents into the Supabase vector store.
+
+    All documents in a batch go through one pipeline run, so their chunks are embedded
+    together and written to pgvector in a few large INSERTs instead of one per document.
+
+    :param documents: A list of dicts with 'id' (UUID from the 'documents' table) and 'content' (full text).
+    :param batch_size: Maximum number of parent documents sent through the pipeline at once.
+    """
+    print(f"Starting indexing for {len(documents)} document(s)...")
+
+    indexing_pipeline = _get_indexing_pipeline()
+
+    for start in range(0, len(documents), batch_size):
+        # The splitter will automatically create chunks and preserve the metadata.
+        parent_documents = [
+            Document(id=row["id"], content=row["content"])
+            for row in documents[start:start + batch_size]
+        ]
+        # Run the pipeline to chunk and embed the whole batch, then write its chunks
+        result = indexing_pipeline.run({"splitter": {"documents": parent_documents}})
+        _write_chunks(result["embedder"]["documents"])
+
+    print(f"Indexing complete for {len(documents)} document(s).")
+
+
+def index_document(parent_doc_id: str, document_content: str, batch_size: int = WRITE_BATCH_SIZE):
     """
     Chunks, embeds, and indexes a single document into the Supabase vector store.
     
     :param parent_doc_id: The unique UUID of the parent document from your 'documents' table.
     :param document_content: The full text content of the document.
+    :param batch_size: Maximum number of chunks written per INSERT statement.
     """
     print(f"Starting indexing for document ID: {parent_doc_id}...")
-    
-    # --- 1. SETUP ---
-    load_dotenv()
-    EMBEDDING_MODEL_NAME = "BAAI/bge-m3"
-    connection_string = Secret.from_env_var("CONN_STR")
-
-    document_store = PgvectorDocumentStore(
-        connection_string=connection_string,
-        table_name="document_sections_embeddings",
-        embedding_dimension=1024,
-        vector_function="cosine_similarity"
-    )
-    
-    # --- 2. CREATE AND RUN THE INDEXING PIPELINE ---
-
-    # The splitter will automatically create chunks and preserve the metadata.
-    parent_document = Document(
-        id=parent_doc_id, # Set the ID here
-        content=document_content,
-    )
-
-    indexing_pipeline = Pipeline()
-    indexing_pipeline.add_component("splitter", DocumentSplitter(split_by="sentence", split_length=6, split_overlap=2))
-    indexing_pipeline.add_component("embedder", SentenceTransformersDocumentEmbedder(model=EMBEDDING_MODEL_NAME))
-    indexing_pipeline.add_component("writer", DocumentWriter(document_store=document_store, policy=DuplicatePolicy.OVERWRITE))
-    indexing_pipeline.connect("splitter.documents", "embedder.documents")
-    indexing_pipeline.connect("embedder.documents", "writer.documents")
-
-    # Run the pipeline to chunk, embed, and write the document
-    indexing_pipeline.run({"splitter": {"documents": [parent_document]}})
+
+    # One document gains nothing from the pipeline's scheduling and per-component input
+    # validation, so its warmed components are called directly in sequence.
+    indexing_pipeline = _get_indexing_pipeline()
+    parent_document = Document(id=parent_doc_id, content=document_content)
+    chunks = indexing_pipeline.get_component("splitter").run(documents=[parent_document])["documents"]
+    chunks = indexing_pipeline.get_component("embedder").run(documents=chunks)["documents"]
+    _write_chunks(chunks, batch_size=batch_size)
+
     print(f"Indexing complete for document {parent_doc_id}.")
 
 
 # This block allows you to run this file directly as a script for testing
 if __name__ == "__main__":
     PARENT_DOC_ID = "70c10cdc-624a-490f-96da-0b190d082893"
-    full_document_content = """
-    Company: Kochi Metro Rail Ltd (KMRL) Document ID: KMRL-O&M-OPT-SOP-068 SOP Number: 15 Revision: 05 Title: SOP for Resumption of revenue service post lock down period Date: 01.09.2020 1. Introduction and Applicability This procedure provides guidelines for the working of stations and trains during the resumption of revenue service. It is applicable to all KMRL O&M staff and contractors involved in the working of trains and stations. Deputy Heads of Departments (Dy HODs) must ensure the 
-    SOP is circulated and acknowledged by all staff. 2. Headway and Train Service The resumption of services will occur in a staged manner. 
-    Stage I (07.09.2020 & 08.09.2020): Revenue services will run from 07:00 to 12:00 and 14:00 to 20:00 with a 10-minute headway. 
-    No passenger services will be available between 12:00 and 14:00. Stage II (From 09.09.2020 onwards): Weekdays: Services will run from 07:00 to 22:00. Sundays: Services will start from 08:00. Management may adjust the headway based on passenger patronage. A trial run must be conducted before revenue services begin. Dwell time at stations will be a minimum of 20 seconds for ventilation. Layover time at terminals will be a minimum of 5 minutes with saloon doors open. Stations in containment zones will be closed to the public. 3. Preparatory Works and System Fitness All departments must ensure systems are safe and healthy before service resumption. Dy HODs must provide fitness certificates for their respective systems to stations and the Operations Control Centre (OCC). This includes: Track, Structure, and SOD clearance from CTR. Traction fitness from PST. Electrical installations, lifts, and escalators fitness. Train fitness from RST. ATP, signaling equipment, and gears fitness from STC. Telecom (PIDS, PAS) and AFC system fitness from COM. 4. Cleaning and Disinfection of Trains All trains will be sent to the depot daily after service. The RST department must clean the air-conditioner ducts before a train is in service. AC filters must be cleaned weekly. The saloon AC temperature will be set to 26 degrees Celsius, with a relative humidity of 40-70%. Train interiors, including grab poles, handles, and seats, will be cleaned nightly with disinfectant. Metallic surfaces can be cleaned with a 70% alcohol-based cleaner. All trains in service will be sprayed with a hypochlorite-based disinfectant. 5. Passenger Screening, Sanitization, and Social Distancing All stations will be disinfected daily. Foot-pedal operated hand sanitizers will be available at all station entry points. All passengers must wear masks. Passengers will be screened for body temperature with an infrared thermometer. Thermal cameras will be used at high-footfall stations. If a person shows symptoms of COVID-19, they will be guided to an isolated area, and the Station Controller must email idspekm@gmail.com, call the Tele health Help Line at 8086882228, follow instructions, and report to the OCC. Lifts will be limited to 2-3 persons. Passengers are advised to stand on alternate steps on escalators. Public contact points like AFC gates, counters, and handrails must be cleaned with disinfectant every 4 hours or sooner. Contactless frisking will be performed. Usage of the Aarogya Setu App will be encouraged. 6. Crowd Control Crowds will be regulated, and entry may be restricted if platforms become crowded. A maximum of two entry gates per station will be kept open. Executives at the AM/Manager level will be deployed to monitor every three stations for cleanliness and social distancing. Liaison with state police and local administration is required to manage crowds outside stations. 7. Guidelines for Staff Breath Analyser (BA) tests are exempted until further orders; a declaration must be signed instead. Train Operators must wear masks and gloves while on duty. All staff must undergo thermal screening before their shift. Workplaces, especially frequently touched surfaces, must be frequently sanitized. Social distancing of at least 6 feet must be maintained in gatherings and meetings. Employees at higher risk, including pregnant employees, should not be assigned to front-line work.
-    """
+    full_document_content = load_sample_document()
     
     index_document(parent_doc_id=PARENT_DOC_ID, document_content=full_document_content)
\ No newline at end of file
@@ -0,0 +1,31 @@
+# prompt_builder.py
+from typing import List
+from haystack import component
+from haystack.dataclasses import ChatMessage, Document
+
+
+@component
+class RagPromptBuilder:
+    """
+    Builds the [system, user] messages for a RAG question without Jinja.
+
+    ChatPromptBuilder renders its template through Jinja on every call; with a handful of
+    documents the prompt is just their contents joined together, so it is assembled with
+    str.join and str.format instead. `user_template` takes `{documents}` and `{question}`.
+
+    Documents are joined in id order, not rank order: questions that retrieve the same
+    chunks then send byte-identical prompts up to the question, which is the part
+    Gemini's prefix caching can reuse.
+    """
+    def __init__(self, system_prompt: str, user_template: str):
+        self.system_prompt = system_prompt
+        self.user_template = user_template
+        # Built once: the system message is identical for every question
+        self._system_message = ChatMessage.from_system(system_prompt)
+
+    @component.output_types(prompt=List[ChatMessage])
+    def run(self, question: str, documents: List[Document]):
+        ordered = sorted(documents, key=lambda doc: doc.id)
+        context = "\n".join(doc.content for doc in ordered if doc.content)
+        user_message = ChatMessage.from_user(self.user_template.format(documents=context, question=question))
+        return {"prompt": [self._system_message, user_message]}
@@ -0,0 +1,81 @@
+# quantized_retriever.py
+from typing import List
+from haystack import component
+from haystack.dataclasses import Document
+from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
+from haystack.document_stores.errors import DocumentStoreError
+from psycopg import Error
+from psycopg.sql import SQL, Identifier, Literal as SQLLiteral
+from Model_rag.document_store import get_connection, rows_to_documents
+
+# Coarse distance per precision, as "{stored} <op> {query}" over quantized expressions.
+# Each expression matches an index in Model_rag/sql/ so the coarse stage is an index scan.
+_COARSE_SQL = {
+    # Sign bits, Hamming distance: 128 bytes per 1024-dim row (binary_quantize_index.sql)
+    "binary": "binary_quantize(embedding)::bit({dim}) <~> binary_quantize(%(q)s::{vector_type})",
+}
+
+# An HNSW scan returns at most hnsw.ef_search rows (default 40), however high the LIMIT, so
+# the coarse stage raises it to `candidates` for its own transaction. 1000 is pgvector's maximum.
+_MAX_EF_SEARCH = 1000
+
+
+@component
+class QuantizedRetriever:
+    """
+    Two-stage retriever over quantized embeddings.
+
+    Stage one ranks rows on a quantized copy of the embedding (`precision` "binary"),
+    served by an expression index, so the scan moves a fraction of the bytes of the
+    stored column; hnsw.ef_search is raised to `candidates` for that scan. Stage two re-scores only those `candidates` rows by inner product
+    on the stored embeddings and keeps the best `top_k`.
+    Scores are inner products, the same as PgvectorDocumentStore with vector_function="inner_product".
+    Only the store's public settings are read; the query runs on this thread's get_connection().
+    """
+    def __init__(self, document_store: PgvectorDocumentStore, precision: str = "binary", top_k: int = 10, candidates: int = 200):
+        if precision not in _COARSE_SQL:
+            raise ValueError(f"precision must be one of {sorted(_COARSE_SQL)}, got '{precision}'.")
+        if candidates < top_k:
+            raise ValueError("candidates must be at least top_k.")
+        if candidates > _MAX_EF_SEARCH:
+            raise ValueError(f"candidates must be at most {_MAX_EF_SEARCH}, the largest hnsw.ef_search.")
+        self.document_store = document_store
+        self.precision = precision
+        self.top_k = top_k
+        self.candidates = candidates
+
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float]):
+        store = self.document_store
+        # The dimension is an int from the store's config, so it is safe to inline
+        coarse = _COARSE_SQL[self.precision].replace("{dim}", str(int(store.embedding_dimension)))
+        coarse = coarse.replace("{vector_type}", store.vector_type)
+        sql_query = SQL(
+            "SELECT id, content, meta, embedding::real[] AS embedding, "
+            "(embedding <#> %(q)s::{vector_type}) * -1 AS score FROM ("
+            "SELECT id, content, meta, embedding FROM {schema_name}.{table_name} "
+            "ORDER BY {coarse} "
+            "LIMIT {candidates}"
+            ") AS coarse "
+            "ORDER BY embedding <#> %(q)s::{vector_type} ASC LIMIT {top_k}"
+        ).format(
+            vector_type=SQL(store.vector_type),
+            schema_name=Identifier(store.schema_name),
+            table_name=Identifier(store.table_name),
+            coarse=SQL(coarse),
+            candidates=SQLLiteral(self.candidates),
+            top_k=SQLLiteral(self.top_k),
+        )
+        vector = "[" + ",".join(str(value) for value in query_embedding) + "]"
+
+        # SET LOCAL only lasts until the end of the transaction, and get_connection() is in
+        # autocommit mode, so the setting and the query share an explicit transaction
+        connection = get_connection()
+        try:
+            with connection.transaction():
+                connection.execute(SQL("SET LOCAL hnsw.ef_search = {ef_search}").format(
+                    ef_search=SQLLiteral(self.candidates)))
+                records = connection.execute(sql_query, {"q": vector}).fetchall()
+        except Error as e:
+            raise DocumentStoreError("Could not retrieve documents from PgvectorDocumentStore") from e
+        return {"documents": rows_to_documents(records)}
@@ -1,32 +1,171 @@
-import os
+import atexit
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from haystack import Pipeline
-from haystack.components.embedders import SentenceTransformersTextEmbedder
-from haystack.dataclasses import ChatMessage 
-from haystack.components.builders.chat_prompt_builder import ChatPromptBuilder
-from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
+from haystack.components.embedders import SentenceTransformersDocumentEmbedder
+from haystack.dataclasses import ChatMessage
 from haystack_integrations.components.retrievers.pgvector import PgvectorEmbeddingRetriever
 from haystack_integrations.components.generators.google_genai import GoogleGenAIChatGenerator
-from haystack.utils import Secret
-from dotenv import load_dotenv
-import google.generativeai as genai
+from Model_rag._env import (
+    RERANK_OVERSAMPLE, QUERY_BATCH_SIZE, QUERY_BATCH_WAIT_MS, QUANTIZED_RETRIEVAL, QUANTIZED_CANDIDATES,
+    SUMMARY_CHUNK_CHARS, SUMMARY_CONCURRENCY, EMBEDDING_CACHE_SIZE, ANSWER_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_PATH
+)
+from Model_rag.batch_retriever import BatchPgvectorRetriever
+from Model_rag.batching_embedder import BatchingTextEmbedder
+from Model_rag.cached_embedder import CachedTextEmbedder
+from Model_rag.document_store import get_document_store
+from Model_rag.index import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, QUERY_EMBEDDING_MODEL_KWARGS, load_sample_document, prewarm_model_files
+from Model_rag.prompt_builder import RagPromptBuilder
+from Model_rag.quantized_retriever import QuantizedRetriever
+from Model_rag.rerank import EmbeddingReranker
+from Model_rag.semantic_cache import SemanticCache
 
+# Static parts of the prompt come first and the question last, so every request
+# shares the same prefix and Gemini's implicit prefix caching can reuse it.
+SYSTEM_PROMPT = "Answer the question based only on the provided documents."
+USER_PROMPT_TEMPLATE = "Documents:\n{documents}\n\nQuestion: {question}"
 
-def summarizer(content):
-    def removeSymbols(response):
-        return response.strip().replace("*", '')
-    
-    def gemini_pro_response(user_prompt):
-        gemini_pro_model = genai.GenerativeModel("gemini-2.5-flash")
-        response = gemini_pro_model.generate_content(user_prompt)
-        return removeSymbols(response.text)
-    
-    load_dotenv()
-    api_key = os.getenv("GOOGLE_API_KEY")
-    genai.configure(api_key=api_key)
-    prompt = '''You're an expert content summarizer, given the content to you, you need to summarize the content in
+LLM_MODEL_NAME = "gemini-2.5-flash"
+
+SUMMARY_PROMPT = '''You're an expert content summarizer, given the content to you, you need to summarize the content in
     such a way that the important context or words are highlighted and 
     you give a detailed, easy to understand and effective insightful summary'''
-    return (gemini_pro_response(prompt+content)) #Change it to print to test
+# Gemini marks highlights with Markdown asterisks; summaries are shown as plain text
+_STRIP_SYMBOLS = str.maketrans("", "", "*")
+# Bounds concurrent summary requests across summarizer() and summarize_batch() callers
+_SUMMARY_SLOTS = threading.BoundedSemaphore(SUMMARY_CONCURRENCY)
+
+TOP_K = 3
+
+# Repeated and near-duplicate questions ("When are services unavailable?") hit this one,
+# as long as they retrieve the same, unchanged chunks as the cached answer. There is no
+# cache in front of retrieval: an answer is only reused after its grounding is checked.
+_SEMANTIC_CACHE = SemanticCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    max_size=ANSWER_CACHE_SIZE,
+    path=SEMANTIC_CACHE_PATH
+)
+atexit.register(_SEMANTIC_CACHE.save)
+
+# Start reading the model weights from disk now, so the first question does not wait on it
+prewarm_model_files()
+
+# Built once per process: loading bge-m3 and connecting to Postgres take seconds,
+# while the components themselves keep no per-question state
+_TEXT_EMBEDDER = None
+_GENERATION_PIPELINE = None
+_PIPELINE_LOCK = threading.Lock()
+# The retriever is bound to a document store, and stores are per thread (see get_document_store)
+_LOCAL = threading.local()
+
+
+def _get_text_embedder():
+    """Returns the warmed question embedder shared by every query, with repeated questions served from memory."""
+    global _TEXT_EMBEDDER
+    if _TEXT_EMBEDDER is None:
+        with _PIPELINE_LOCK:
+            if _TEXT_EMBEDDER is None:
+                # Cache misses from concurrent requests are embedded together in one forward pass
+                text_embedder = CachedTextEmbedder(
+                    BatchingTextEmbedder(
+                        SentenceTransformersDocumentEmbedder(model=EMBEDDING_MODEL_NAME, batch_size=QUERY_BATCH_SIZE, normalize_embeddings=True, progress_bar=False, backend=EMBEDDING_BACKEND, model_kwargs=QUERY_EMBEDDING_MODEL_KWARGS),
+                        max_batch_size=QUERY_BATCH_SIZE,
+                        max_wait_ms=QUERY_BATCH_WAIT_MS
+                    ),
+                    max_size=EMBEDDING_CACHE_SIZE
+                )
+                text_embedder.warm_up()
+                _TEXT_EMBEDDER = text_embedder
+    return _TEXT_EMBEDDER
+
+
+def _get_retrieval_pipeline():
+    """Builds this thread's retriever -> reranker pipeline once and reuses it."""
+    retrieval_pipeline = getattr(_LOCAL, "retrieval_pipeline", None)
+    if retrieval_pipeline is None:
+        document_store = get_document_store()
+        if QUANTIZED_RETRIEVAL:
+            retriever = QuantizedRetriever(document_store=document_store, precision=QUANTIZED_RETRIEVAL, top_k=TOP_K * RERANK_OVERSAMPLE, candidates=QUANTIZED_CANDIDATES)
+        else:
+            retriever = PgvectorEmbeddingRetriever(document_store=document_store, top_k=TOP_K * RERANK_OVERSAMPLE)
+
+        retrieval_pipeline = Pipeline()
+        retrieval_pipeline.add_component("retriever", retriever)
+        retrieval_pipeline.add_component("reranker", EmbeddingReranker(top_k=TOP_K))
+        retrieval_pipeline.connect("retriever.documents", "reranker.documents")
+        retrieval_pipeline.warm_up()
+        _LOCAL.retrieval_pipeline = retrieval_pipeline
+    return retrieval_pipeline
+
+
+def _get_generation_pipeline():
+    """Builds the prompt -> Gemini pipeline once and reuses it."""
+    global _GENERATION_PIPELINE
+    if _GENERATION_PIPELINE is None:
+        with _PIPELINE_LOCK:
+            if _GENERATION_PIPELINE is None:
+                generation_pipeline = Pipeline()
+                generation_pipeline.add_component("message_builder", RagPromptBuilder(system_prompt=SYSTEM_PROMPT, user_template=USER_PROMPT_TEMPLATE))
+                generation_pipeline.add_component("llm", GoogleGenAIChatGenerator(model=LLM_MODEL_NAME))
+                generation_pipeline.connect("message_builder.prompt", "llm.messages")
+                generation_pipeline.warm_up()
+                _GENERATION_PIPELINE = generation_pipeline
+    return _GENERATION_PIPELINE
+
+
+def _reply_text(reply) -> str:
+    """Extracts the plain answer text from a generator reply (a ChatMessage)."""
+    return "".join(reply.texts)
+
+
+def _get_llm():
+    """
+    Returns the Gemini chat generator of the generation pipeline. Summaries go through it too,
+    so answers and summaries share one google-genai client and its open connections.
+    """
+    return _get_generation_pipeline().get_component("llm")
+
+
+def _summarize_once(content: str) -> str:
+    with _SUMMARY_SLOTS:
+        reply = _get_llm().run(messages=[ChatMessage.from_user(SUMMARY_PROMPT + content)])["replies"][0]
+    return _reply_text(reply).strip().translate(_STRIP_SYMBOLS)
+
+
+def _split_paragraphs(content: str, max_chars: int) -> list[str]:
+    """Groups consecutive paragraphs into parts of at most max_chars (a longer paragraph stays whole)."""
+    parts, current, size = [], [], 0
+    for paragraph in content.split("\n\n"):
+        if current and size + len(paragraph) > max_chars:
+            parts.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + 2
+    if current:
+        parts.append("\n\n".join(current))
+    return parts
+
+
+def summarizer(content):
+    """
+    Summarizes a document with Gemini. Long documents are split by paragraph, the parts are
+    summarized in parallel, and their summaries are combined by one more summarization pass.
+    """
+    parts = _split_paragraphs(content, SUMMARY_CHUNK_CHARS)
+    if len(parts) <= 1:
+        return _summarize_once(content)
+    with ThreadPoolExecutor(max_workers=min(len(parts), SUMMARY_CONCURRENCY)) as executor:
+        partial_summaries = list(executor.map(_summarize_once, parts))
+    return _summarize_once("\n\n".join(partial_summaries))
+
+
+def summarize_batch(contents: list[str]) -> list[str]:
+    """Summarizes several documents concurrently; the summaries are returned in input order."""
+    if not contents:
+        return []
+    with ThreadPoolExecutor(max_workers=min(len(contents), SUMMARY_CONCURRENCY)) as executor:
+        return list(executor.map(summarizer, contents))
 
 def ask_question(question: str):
     """
@@ -37,71 +176,115 @@ def ask_question(question: str):
     """
     print(f"Running query: '{question}'")
     
-    # --- 1. SETUP ---
-    load_dotenv()
-    LLM_MODEL_NAME = "gemini-2.5-flash"
-    EMBEDDING_MODEL_NAME = "BAAI/bge-m3"
-    connection_string = Secret.from_env_var("CONN_STR")
-    google_api_key = Secret.from_env_var("GOOGLE_API_KEY")
-
-    document_store = PgvectorDocumentStore(
-        connection_string=connection_string,
-        table_name="document_sections_embeddings",
-        embedding_dimension=1024
-    )
-    
-    # --- 2. CREATE AND RUN THE QUERYING PIPELINE ---
-    chat_prompt_template = [
-        ChatMessage.from_system("Answer the question based only on the provided documents."),
-        ChatMessage.from_user(
-            """
-            Documents:
-            {% for doc in documents %}
-                {{ doc.content }}
-            {% endfor %}
-
-            Question: {{question}}
-            """
-        )
-    ]
-    
-    query_pipeline = Pipeline()
-    query_pipeline.add_component("text_embedder", SentenceTransformersTextEmbedder(model=EMBEDDING_MODEL_NAME))
-    query_pipeline.add_component("retriever", PgvectorEmbeddingRetriever(document_store=document_store, top_k=3))
-    query_pipeline.add_component("message_builder", ChatPromptBuilder(template=chat_prompt_template, required_variables=["question"]))
-    query_pipeline.add_component("llm", GoogleGenAIChatGenerator(model=LLM_MODEL_NAME))
-
-    query_pipeline.connect("text_embedder.embedding", "retriever.query_embedding")
-    query_pipeline.connect("retriever.documents", "message_builder.documents")
-    query_pipeline.connect("message_builder.prompt", "llm.messages")
-    
-    result = query_pipeline.run({
-        "text_embedder": {"text": question},
-        "message_builder": {"question": question}
+    # --- 1. EMBED THE QUESTION AND RETRIEVE ---
+    query_embedding = _get_text_embedder().run(text=question)["embedding"]
+    documents = _get_retrieval_pipeline().run({
+        "retriever": {"query_embedding": query_embedding},
+        "reranker": {"query_embedding": query_embedding}
+    })["reranker"]["documents"]
+
+    # --- 2. CHECK THE SEMANTIC CACHE ---
+    cached_answer = _SEMANTIC_CACHE.lookup(query_embedding, documents)
+    if cached_answer is not None:
+        print(f"Semantic cache hit for query: '{question}'")
+        return cached_answer
+
+    # --- 3. GENERATE THE ANSWER ---
+    result = _get_generation_pipeline().run({
+        "message_builder": {"question": question, "documents": documents}
     })
     
-    answer = result["llm"]["replies"][0]._content
-    
-    # Handle case where answer might be a list or TextContent object
-    if isinstance(answer, list):
-        # Extract text from TextContent objects in the list
-        text_parts = []
-        for item in answer:
-            if hasattr(item, 'text'):
-                text_parts.append(item.text)
-            else:
-                text_parts.append(str(item))
-        answer = " ".join(text_parts)
-    elif hasattr(answer, 'text'):
-        answer = answer.text
-    elif isinstance(answer, str) and "TextContent(text=" in answer:
-        # Extract content from TextContent string representation
-        import re
-        match = re.search(r"TextContent\(text='(.*?)'\)", answer)
-        if match:
-            answer = match.group(1)
-    
-    return str(answer)
+    answer = _reply_text(result["llm"]["replies"][0])
+    if answer:
+        _SEMANTIC_CACHE.add(query_embedding, answer, documents)
+    return answer
+
+
+def stream_answer(question: str):
+    """
+    Same as ask_question, but yields the answer in pieces as Gemini generates it,
+    so the caller can forward text before the reply is complete. Cached answers are yielded whole.
+
+    :param question: The user's question.
+    :return: A generator of answer text chunks.
+    """
+    query_embedding = _get_text_embedder().run(text=question)["embedding"]
+    documents = _get_retrieval_pipeline().run({
+        "retriever": {"query_embedding": query_embedding},
+        "reranker": {"query_embedding": query_embedding}
+    })["reranker"]["documents"]
+
+    cached_answer = _SEMANTIC_CACHE.lookup(query_embedding, documents)
+    if cached_answer is not None:
+        yield cached_answer
+        return
+
+    # The generator runs in a worker thread and hands chunks over through a queue;
+    # `finished` marks the end of the stream whether the call succeeded or failed
+    chunks = queue.Queue()
+    finished = object()
+    failure = []
+
+    def generate():
+        try:
+            _get_generation_pipeline().run({
+                "message_builder": {"question": question, "documents": documents},
+                "llm": {"streaming_callback": lambda chunk: chunks.put(chunk.content)}
+            })
+        except Exception as e:
+            failure.append(e)
+        finally:
+            chunks.put(finished)
+
+    threading.Thread(target=generate, daemon=True).start()
+    parts = []
+    while (text := chunks.get()) is not finished:
+        if text:
+            parts.append(text)
+            yield text
+    if failure:
+        raise failure[0]
+
+    answer = "".join(parts)
+    if answer:
+        _SEMANTIC_CACHE.add(query_embedding, answer, documents)
+
+
+def ask_questions(questions: list[str]) -> list[str]:
+    """
+    Answers several questions at once, e.g. for evaluation runs.
+    The documents for every question are retrieved with a single SQL query.
+
+    :param questions: The user's questions.
+    :return: The generated answers, in the same order as the questions.
+    """
+    if not questions:
+        return []
+    answers = [None] * len(questions)
+
+    text_embedder = _get_text_embedder()
+    query_embeddings = {i: text_embedder.run(text=question)["embedding"] for i, question in enumerate(questions)}
+
+    retriever = BatchPgvectorRetriever(document_store=get_document_store(), top_k=TOP_K * RERANK_OVERSAMPLE)
+    retrieved = retriever.run(query_embeddings=list(query_embeddings.values()))["documents"]
+
+    reranker = EmbeddingReranker(top_k=TOP_K)
+    generation_pipeline = _get_generation_pipeline()
+    for (i, query_embedding), candidates in zip(query_embeddings.items(), retrieved):
+        documents = reranker.run(query_embedding=query_embedding, documents=candidates)["documents"]
+        cached_answer = _SEMANTIC_CACHE.lookup(query_embedding, documents)
+        if cached_answer is not None:
+            answers[i] = cached_answer
+            continue
+
+        result = generation_pipeline.run({
+            "message_builder": {"question": questions[i], "documents": documents}
+        })
+        answer = _reply_text(result["llm"]["replies"][0])
+        if answer:
+            _SEMANTIC_CACHE.add(query_embedding, answer, documents)
+        answers[i] = answer
+    return answers
 
 # This block allows you to run this file directly as a script for testing
 if __name__ == "__main__":
@@ -113,10 +296,5 @@ if __name__ == "__main__":
     print(f"Answer: {answer}")
     print("="*30)
     #Below is to test summarization
-    full_document_content = """
-    Company: Kochi Metro Rail Ltd (KMRL) Document ID: KMRL-O&M-OPT-SOP-068 SOP Number: 15 Revision: 05 Title: SOP for Resumption of revenue service post lock down period Date: 01.09.2020 1. Introduction and Applicability This procedure provides guidelines for the working of stations and trains during the resumption of revenue service. It is applicable to all KMRL O&M staff and contractors involved in the working of trains and stations. Deputy Heads of Departments (Dy HODs) must ensure the 
-    SOP is circulated and acknowledged by all staff. 2. Headway and Train Service The resumption of services will occur in a staged manner. 
-    Stage I (07.09.2020 & 08.09.2020): Revenue services will run from 07:00 to 12:00 and 14:00 to 20:00 with a 10-minute headway. 
-    No passenger services will be available between 12:00 and 14:00. Stage II (From 09.09.2020 onwards): Weekdays: Services will run from 07:00 to 22:00. Sundays: Services will start from 08:00. Management may adjust the headway based on passenger patronage. A trial run must be conducted before revenue services begin. Dwell time at stations will be a minimum of 20 seconds for ventilation. Layover time at terminals will be a minimum of 5 minutes with saloon doors open. Stations in containment zones will be closed to the public. 3. Preparatory Works and System Fitness All departments must ensure systems are safe and healthy before service resumption. Dy HODs must provide fitness certificates for their respective systems to stations and the Operations Control Centre (OCC). This includes: Track, Structure, and SOD clearance from CTR. Traction fitness from PST. Electrical installations, lifts, and escalators fitness. Train fitness from RST. ATP, signaling equipment, and gears fitness from STC. Telecom (PIDS, PAS) and AFC system fitness from COM. 4. Cleaning and Disinfection of Trains All trains will be sent to the depot daily after service. The RST department must clean the air-conditioner ducts before a train is in service. AC filters must be cleaned weekly. The saloon AC temperature will be set to 26 degrees Celsius, with a relative humidity of 40-70%. Train interiors, including grab poles, handles, and seats, will be cleaned nightly with disinfectant. Metallic surfaces can be cleaned with a 70% alcohol-based cleaner. All trains in service will be sprayed with a hypochlorite-based disinfectant. 5. Passenger Screening, Sanitization, and Social Distancing All stations will be disinfected daily. Foot-pedal operated hand sanitizers will be available at all station entry points. All passengers must wear masks. Passengers will be screened for body temperature with an infrared thermometer. Thermal cameras will be used at high-footfall stations. If a person shows symptoms of COVID-19, they will be guided to an isolated area, and the Station Controller must email idspekm@gmail.com, call the Tele health Help Line at 8086882228, follow instructions, and report to the OCC. Lifts will be limited to 2-3 persons. Passengers are advised to stand on alternate steps on escalators. Public contact points like AFC gates, counters, and handrails must be cleaned with disinfectant every 4 hours or sooner. Contactless frisking will be performed. Usage of the Aarogya Setu App will be encouraged. 6. Crowd Control Crowds will be regulated, and entry may be restricted if platforms become crowded. A maximum of two entry gates per station will be kept open. Executives at the AM/Manager level will be deployed to monitor every three stations for cleanliness and social distancing. Liaison with state police and local administration is required to manage crowds outside stations. 7. Guidelines for Staff Breath Analyser (BA) tests are exempted until further orders; a declaration must be signed instead. Train Operators must wear masks and gloves while on duty. All staff must undergo thermal screening before their shift. Workplaces, especially frequently touched surfaces, must be frequently sanitized. Social distancing of at least 6 feet must be maintained in gatherings and meetings. Employees at higher risk, including pregnant employees, should not be assigned to front-line work.
-    """
+    full_document_content = load_sample_document()
     summarizer(full_document_content)
\ No newline at end of file
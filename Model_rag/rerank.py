@@ -0,0 +1,51 @@
+# rerank.py
+from typing import List
+import numpy as np
+from haystack import component
+from haystack.dataclasses import Document
+
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+
+def cosine_scores(query_embedding: List[float], embeddings: List[List[float]]) -> np.ndarray:
+    """
+    Cosine similarity of one query vector against a stack of vectors.
+    Uses SimSIMD's SIMD kernels when installed, otherwise a NumPy matrix-vector product.
+    """
+    query = np.asarray(query_embedding, dtype=np.float32)
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if simsimd is not None:
+        distances = np.asarray(simsimd.cdist(query[np.newaxis, :], matrix, metric="cosine"))
+        return 1.0 - distances.reshape(-1)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    norms[norms == 0] = 1.0
+    return (matrix @ query) / norms
+
+
+@component
+class EmbeddingReranker:
+    """
+    Re-orders retrieved documents by exact cosine similarity to the query embedding
+    and keeps the best `top_k`. Documents without an embedding are kept after the scored ones.
+    """
+    def __init__(self, top_k: int = 3):
+        self.top_k = top_k
+
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float], documents: List[Document]):
+        scored = [doc for doc in documents if doc.embedding is not None]
+        unscored = [doc for doc in documents if doc.embedding is None]
+        if not scored:
+            return {"documents": documents[:self.top_k]}
+
+        scores = cosine_scores(query_embedding, [doc.embedding for doc in scored])
+        order = np.argsort(-scores, kind="stable")
+        reranked = []
+        for idx in order:
+            doc = scored[idx]
+            doc.score = float(scores[idx])
+            reranked.append(doc)
+        return {"documents": (reranked + unscored)[:self.top_k]}
@@ -0,0 +1,174 @@
+# semantic_cache.py
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from haystack.dataclasses import Document
+
+# Random-hyperplane LSH: each entry gets a 32-bit sign code of its embedding. Two vectors
+# at cosine 0.92 differ in ~4 of 32 bits on average, so candidates are probed by Hamming
+# radius rather than by exact bucket, which would miss most paraphrases.
+LSH_BITS = 32
+LSH_RADIUS = 8
+LSH_SEED = 0
+
+# Number of set bits in each byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _unit(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _sources(documents: Optional[List[Document]]) -> Optional[Dict[str, str]]:
+    """Maps each retrieved chunk id to a hash of its content."""
+    if documents is None:
+        return None
+    return {
+        doc.id: hashlib.blake2b((doc.content or "").encode("utf-8"), digest_size=8).hexdigest()
+        for doc in documents
+    }
+
+
+def _grounded(cached: Optional[Dict[str, str]], current: Optional[Dict[str, str]], min_overlap: float) -> bool:
+    """
+    True when the chunks retrieved now match the chunks the cached answer was generated from:
+    Jaccard overlap of the ids >= min_overlap and unchanged content for every shared id.
+    """
+    if cached is None or current is None:
+        return cached is None and current is None
+    shared = cached.keys() & current.keys()
+    union = cached.keys() | current.keys()
+    if union and len(shared) / len(union) < min_overlap:
+        return False
+    return all(cached[doc_id] == current[doc_id] for doc_id in shared)
+
+
+class SemanticCache:
+    """
+    Answers cached by question embedding, so paraphrased questions reuse an earlier answer.
+
+    Embeddings are kept L2-normalized in one float16 matrix next to their 32-bit LSH codes.
+    A lookup first keeps the entries whose code is within LSH_RADIUS bits of the query's,
+    then needs cosine similarity >= `threshold` on the full vectors. When the retrieved
+    documents are passed in, a hit also has to be grounded in the same, unchanged chunks,
+    so an answer is never served after the documents behind it were edited.
+    When full, the least recently used entry is overwritten.
+    """
+    def __init__(self, threshold: float = 0.92, max_size: int = 1000, path: Optional[str] = None, min_overlap: float = 0.8):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.path = path
+        self.min_overlap = min_overlap
+        self._planes = None
+        self._embeddings = None
+        self._codes = np.zeros(max(max_size, 0), dtype=np.uint32)
+        self._answers = []
+        self._sources = []
+        self._last_used = []
+        self._clock = 0
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self._answers)
+
+    def _allocate(self, dimension: int):
+        self._embeddings = np.zeros((self.max_size, dimension), dtype=np.float16)
+        self._planes = np.random.default_rng(LSH_SEED).standard_normal((dimension, LSH_BITS)).astype(np.float32)
+
+    def _code(self, vectors: np.ndarray) -> np.ndarray:
+        bits = (vectors.astype(np.float32) @ self._planes) > 0
+        return np.packbits(bits, axis=-1, bitorder="little").view(np.uint32).reshape(-1)
+
+    def lookup(self, embedding: List[float], documents: Optional[List[Document]] = None) -> Optional[str]:
+        """
+        Returns the cached answer for the most similar earlier question above the threshold whose
+        chunks match `documents` (the chunks retrieved for this question), or None.
+        """
+        query = _unit(embedding)
+        sources = _sources(documents)
+        with self._lock:
+            size = len(self._answers)
+            if size == 0:
+                return None
+            distances = _POPCOUNT[(self._codes[:size] ^ self._code(query)[0]).view(np.uint8)].reshape(size, 4).sum(axis=1)
+            candidates = np.flatnonzero(distances <= LSH_RADIUS)
+            if candidates.size == 0:
+                return None
+            scores = self._embeddings[candidates].astype(np.float32) @ query
+            # The closest entry may be grounded in chunks that have since changed while a
+            # slightly less similar one still matches, so every entry above the threshold is tried
+            for best in np.argsort(-scores):
+                if scores[best] < self.threshold:
+                    return None
+                slot = int(candidates[best])
+                if _grounded(self._sources[slot], sources, self.min_overlap):
+                    self._clock += 1
+                    self._last_used[slot] = self._clock
+                    return self._answers[slot]
+            return None
+
+    def add(self, embedding: List[float], answer: str, documents: Optional[List[Document]] = None):
+        """Stores an answer with the chunks it was generated from, evicting the least recently used one when full."""
+        if self.max_size <= 0:
+            return
+        vector = _unit(embedding)
+        sources = _sources(documents)
+        with self._lock:
+            if self._embeddings is None:
+                self._allocate(vector.shape[0])
+            self._clock += 1
+            if len(self._answers) < self.max_size:
+                slot = len(self._answers)
+                self._answers.append(answer)
+                self._sources.append(sources)
+                self._last_used.append(self._clock)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._answers[slot] = answer
+                self._sources[slot] = sources
+                self._last_used[slot] = self._clock
+            self._embeddings[slot] = vector.astype(np.float16)
+            self._codes[slot] = self._code(vector)[0]
+
+    def save(self):
+        """
+        Writes the cache to `<path>.npz`: the embeddings and, as JSON, the answers and their sources.
+
+        Every gunicorn worker saves at exit, so each writes a file of its own and renames it
+        over `<path>.npz`; the file is always one complete cache, whichever worker exits last.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            size = len(self._answers)
+            if size == 0:
+                return
+            meta = json.dumps({"answers": self._answers, "sources": self._sources, "last_used": self._last_used})
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, embeddings=self._embeddings[:size], meta=np.array(meta))
+            os.replace(tmp_path, f"{self.path}.npz")
+
+    def load(self):
+        """Restores a cache written by save(), if one exists."""
+        if not os.path.exists(f"{self.path}.npz"):
+            return
+        with np.load(f"{self.path}.npz") as saved:
+            embeddings = saved["embeddings"]
+            data = json.loads(str(saved["meta"]))
+        size = min(len(data["answers"]), self.max_size)
+        with self._lock:
+            self._allocate(embeddings.shape[1])
+            self._embeddings[:size] = embeddings[:size]
+            self._codes[:size] = self._code(self._embeddings[:size])
+            self._answers = data["answers"][:size]
+            self._sources = data["sources"][:size]
+            self._last_used = data["last_used"][:size]
+            self._clock = max(self._last_used, default=0)
@@ -0,0 +1,100 @@
+# splitter.py
+import re
+from typing import List
+from haystack import component
+from haystack.dataclasses import Document
+
+# A sentence ends at one or more terminators followed by whitespace or the end of the text.
+# Terminators inside tokens such as "01.09.2020" or "www.example.com" do not end a sentence.
+_SENTENCE_END_RE = re.compile(r"[.!?]+(?=\s|$)\s*")
+
+# Words that end in a full stop without ending the sentence ("Tender No. 5", "Rs. 500", "Dr. Rao"),
+# lowercased and without the full stop. Single letters and dotted initials ("A. K.", "W.P.", "i.e.")
+# are recognised separately. "etc." is left out on purpose: it usually does end the sentence.
+ABBREVIATIONS = frozenset({
+    "no", "nos", "rs", "dr", "mr", "mrs", "ms", "sh", "smt", "shri", "prof", "sr", "jr", "st",
+    "vs", "viz", "ref", "sec", "art", "cl", "fig", "para", "approx", "dept", "govt", "ltd",
+    "pvt", "co", "corp", "inc", "est", "max", "min", "tel", "ph", "encl", "dt", "dtd",
+})
+
+
+def _is_abbreviation(text: str, end: int) -> bool:
+    """True if the word just before text[end] (a full stop) is an abbreviation rather than a sentence end."""
+    start = end
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    word = text[start:end].lstrip("([\"'").lower()
+    if word in ABBREVIATIONS:
+        return True
+    # Initials and dotted abbreviations: every dot-separated part is a single letter
+    parts = word.split(".")
+    return all(len(part) == 1 and part.isalpha() for part in parts)
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Splits text into sentences with a single compiled-regex scan.
+    A lone full stop after an abbreviation or an initial does not end the sentence.
+    Trailing whitespace stays attached to each sentence, so "".join() gives back the original text.
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        if text[match.start():match.end()].rstrip() == "." and _is_abbreviation(text, match.start()):
+            continue
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
+@component
+class FastSentenceSplitter:
+    """
+    Sentence splitter used instead of DocumentSplitter(split_by="sentence"), without NLTK.
+
+    Produces overlapping windows of `split_length` sentences. Each split carries the parent's
+    meta plus source_id, split_id, split_idx_start and page_number (1 + the form feeds before
+    the split, as PDF converters separate pages with "\\f"). Unlike DocumentSplitter it does
+    not add `_split_overlap`, and sentence boundaries come from split_sentences, not NLTK.
+    """
+    def __init__(self, split_length: int = 6, split_overlap: int = 2):
+        if split_length <= 0:
+            raise ValueError("split_length must be greater than 0.")
+        if not 0 <= split_overlap < split_length:
+            raise ValueError("split_overlap must be >= 0 and smaller than split_length.")
+        self.split_length = split_length
+        self.split_overlap = split_overlap
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]):
+        split_docs = []
+        step = self.split_length - self.split_overlap
+        for doc in documents:
+            if doc.content is None:
+                raise ValueError(f"Document with ID {doc.id} has no content to split.")
+            sentences = split_sentences(doc.content)
+
+            # Character offset and page number of each sentence in the parent document
+            offsets = []
+            pages = []
+            position = 0
+            page = 1
+            for sentence in sentences:
+                offsets.append(position)
+                pages.append(page)
+                position += len(sentence)
+                page += sentence.count("\f")
+
+            for split_id, start in enumerate(range(0, len(sentences), step)):
+                window = sentences[start:start + self.split_length]
+                meta = dict(doc.meta)
+                meta["source_id"] = doc.id
+                meta["split_id"] = split_id
+                meta["split_idx_start"] = offsets[start]
+                meta["page_number"] = pages[start]
+                split_docs.append(Document(content="".join(window), meta=meta))
+                if start + self.split_length >= len(sentences):
+                    break
+        return {"documents": split_docs}
@@ -0,0 +1,10 @@
+-- Expression index for QuantizedRetriever(precision="binary") (Model_rag/quantized_retriever.py).
+-- Indexes the sign bits of each embedding (1024 bits = 128 bytes) for Hamming-distance
+-- search; full-precision embeddings stay in the table for the re-scoring stage.
+-- Requires pgvector >= 0.7 for binary_quantize() and bit_hamming_ops.
+CREATE INDEX IF NOT EXISTS dse_binary_idx
+    ON document_sections_embeddings
+    USING hnsw ((binary_quantize(embedding)::bit(1024)) bit_hamming_ops)
+    WITH (m = 16, ef_construction = 64);
+
+ANALYZE document_sections_embeddings;
@@ -0,0 +1,20 @@
+-- Migrates document_sections_embeddings.embedding from vector(1024) to halfvec(1024),
+-- matching PgvectorDocumentStore(vector_type="halfvec") in Model_rag/document_store.py.
+-- The vector_ip_ops HNSW index cannot cover a halfvec column, so it is dropped first and
+-- rebuilt with halfvec_ip_ops. Requires pgvector >= 0.7.
+BEGIN;
+
+DROP INDEX IF EXISTS dse_ip_idx;
+DROP INDEX IF EXISTS dse_halfvec_idx;
+
+ALTER TABLE document_sections_embeddings
+    ALTER COLUMN embedding TYPE halfvec(1024) USING embedding::halfvec(1024);
+
+CREATE INDEX dse_ip_idx
+    ON document_sections_embeddings
+    USING hnsw (embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 64);
+
+COMMIT;
+
+ANALYZE document_sections_embeddings;
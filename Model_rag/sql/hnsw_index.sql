@@ -0,0 +1,9 @@
+-- HNSW index for inner-product search over the halfvec embeddings in document_sections_embeddings.
+-- get_document_store() creates the same index on first use; run this instead to build it
+-- ahead of a deploy, then refresh planner statistics so the index is picked up.
+CREATE INDEX IF NOT EXISTS dse_ip_idx
+    ON document_sections_embeddings
+    USING hnsw (embedding halfvec_ip_ops)
+    WITH (m = 16, ef_construction = 64);
+
+ANALYZE document_sections_embeddings;
@@ -0,0 +1,10 @@
+-- One-off migration for the switch from cosine_similarity to inner_product.
+-- Rows written before the embedders normalized their output are scaled to unit length,
+-- so that their inner product with a normalized query equals cosine similarity.
+-- Run after halfvec_storage.sql: l2_norm() and l2_normalize() take the halfvec column
+-- (vector_norm() only accepts vector). Requires pgvector >= 0.7.
+-- Half precision keeps a normalized row's norm within ~1e-3 of 1, hence the tolerance.
+UPDATE document_sections_embeddings
+SET embedding = l2_normalize(embedding)
+WHERE embedding IS NOT NULL
+  AND abs(l2_norm(embedding) - 1) > 1e-3;
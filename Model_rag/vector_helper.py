@@ -1,56 +1,23 @@
 # vector_helper.py
-import os
-from dotenv import load_dotenv
-from haystack import Pipeline
-from haystack.dataclasses import Document
-from haystack.components.writers import DocumentWriter
-from haystack.document_stores.types import DuplicatePolicy
-from haystack.components.preprocessors import DocumentSplitter
-from haystack.components.embedders import SentenceTransformersDocumentEmbedder
-from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
-from haystack.utils import Secret
+from Model_rag._env import WRITE_BATCH_SIZE
+from Model_rag.index import index_document
 
-def create_vector_embeddings(document_id: str, document_content: str):
+def create_vector_embeddings(document_id: str, document_content: str, batch_size: int = WRITE_BATCH_SIZE):
     """
     Helper function to create vector embeddings for a document.
     This function chunks, embeds, and indexes a document into the Supabase vector store.
     
     :param document_id: The unique UUID of the document from the 'documents' table.
     :param document_content: The full text content of the document.
+    :param batch_size: Maximum number of chunks written per INSERT statement.
     :return: dict with success status and message
     """
     try:
         print(f"Starting vector embedding creation for document ID: {document_id}...")
         
-        # --- 1. SETUP ---
-        load_dotenv()
-        EMBEDDING_MODEL_NAME = "BAAI/bge-m3"
-        connection_string = Secret.from_env_var("CONN_STR")
-
-        document_store = PgvectorDocumentStore(
-            connection_string=connection_string,
-            table_name="document_sections_embeddings",
-            embedding_dimension=1024,
-            vector_function="cosine_similarity"
-        )
-        
-        # --- 2. CREATE AND RUN THE INDEXING PIPELINE ---
-
-        # The splitter will automatically create chunks and preserve the metadata.
-        parent_document = Document(
-            id=document_id, # Set the ID here
-            content=document_content,
-        )
-
-        indexing_pipeline = Pipeline()
-        indexing_pipeline.add_component("splitter", DocumentSplitter(split_by="sentence", split_length=6, split_overlap=2))
-        indexing_pipeline.add_component("embedder", SentenceTransformersDocumentEmbedder(model=EMBEDDING_MODEL_NAME))
-        indexing_pipeline.add_component("writer", DocumentWriter(document_store=document_store, policy=DuplicatePolicy.OVERWRITE))
-        indexing_pipeline.connect("splitter.documents", "embedder.documents")
-        indexing_pipeline.connect("embedder.documents", "writer.documents")
-
-        # Run the pipeline to chunk, embed, and write the document
-        indexing_pipeline.run({"splitter": {"documents": [parent_document]}})
+        # Reuses the process-wide indexing components, so bge-m3 is loaded once
+        # rather than on every upload
+        index_document(parent_doc_id=document_id, document_content=document_content, batch_size=batch_size)
         print(f"Vector embedding creation complete for document {document_id}.")
         
         return {
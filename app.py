@@ -4,6 +4,9 @@ from routes.auth_routes import auth_bp
 from utils.auth_middleware import jwt_required, jwt_optional
 from routes.document_routes import docs_bp
 import os
+import gc
+import sys
+import itertools
 from routes.document_summary import summary_bp
 from routes.rag_routes import rag_bp
 from routes.translate_routes import translate_bp
@@ -33,6 +36,22 @@ app.register_blueprint(summary_bp, url_prefix="/summary")
 app.register_blueprint(rag_bp, url_prefix="/rag")
 app.register_blueprint(translate_bp, url_prefix="/translate")
 
+# Every MEMORY_REAP_INTERVAL requests, collect garbage and hand cached CUDA blocks back, so a
+# long-running worker's memory does not keep growing. Doing it after every request would cost
+# a full collection per request and make the allocator re-reserve memory each time.
+MEMORY_REAP_INTERVAL = int(os.getenv("MEMORY_REAP_INTERVAL", "200"))
+_request_counter = itertools.count(1)
+
+@app.teardown_appcontext
+def release_memory(exc):
+    if MEMORY_REAP_INTERVAL <= 0 or next(_request_counter) % MEMORY_REAP_INTERVAL:
+        return
+    gc.collect()
+    # Only if a model already imported torch; the app itself does not need it
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
 @app.route("/test")
 @jwt_optional
 def test():
@@ -5,23 +5,30 @@ from PIL import Image
 from fpdf import FPDF
 import pdfkit
 import subprocess
-import cv2
+import numpy as np
 import pytesseract
 from transformers import TrOCRProcessor, VisionEncoderDecoderModel
 import re
+import hashlib
+import threading
+import itertools
+from collections import OrderedDict
+from functools import lru_cache
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.pagesizes import A4
-from PyPDF2 import PdfReader
 from deep_translator import GoogleTranslator
 import spacy
+import ahocorasick
 from spacy.matcher import Matcher
-import pdfplumber
+import fitz  # PyMuPDF
 from collections import defaultdict
 import torch
 from pdf2image import convert_from_path
+from concurrent.futures import ThreadPoolExecutor
 
 def convert_to_pdf(input_path: str, output_path: str) -> None:
     mime_type, _ = mimetypes.guess_type(input_path)
@@ -51,9 +58,9 @@ def convert_to_pdf(input_path: str, output_path: str) -> None:
         pdf = FPDF()
         pdf.add_page()
         pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.set_font("Arial", size=12)
-        for line in text.split('\n'):
-            pdf.cell(200, 10, txt=line, ln=True)
+        pdf.set_font("Helvetica", size=12)
+        # One call lays out the whole text: multi_cell breaks at newlines itself and wraps long lines
+        pdf.multi_cell(0, 10, text)
         pdf.output(output_path)
 
     # HTML
@@ -63,47 +70,200 @@ def convert_to_pdf(input_path: str, output_path: str) -> None:
     else:
         raise ValueError(f"Unsupported file type: {mime_type}")
 
+def _as_rgb(img):
+    # convert() copies the whole image even when the mode already matches; pdf2image pages
+    # and most photos are RGB already
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+# OCR text per page image, keyed by a hash of its pixels, least recently used first
+OCR_CACHE_SIZE = 1024
+_OCR_CACHE = OrderedDict()
+_OCR_CACHE_LOCK = threading.Lock()
+
+def _image_key(img) -> str:
+    digest = hashlib.blake2b(img.tobytes(), digest_size=16)
+    digest.update(f"{img.mode}{img.size}".encode("ascii"))
+    return digest.hexdigest()
+
+# reportlab keeps registered fonts for the life of the process, so each font is
+# loaded and registered once instead of on every generated PDF
+@lru_cache(maxsize=None)
+def register_cid_font(name: str) -> str:
+    pdfmetrics.registerFont(UnicodeCIDFont(name))
+    return name
+
+@lru_cache(maxsize=1)
+def register_malayalam_font() -> str:
+    """Registers NotoSansMalayalam-Regular.ttf from the working directory and returns its name, or "Helvetica" if it cannot be used."""
+    malayalam_font_path = os.path.abspath("NotoSansMalayalam-Regular.ttf")
+    if not os.path.exists(malayalam_font_path):
+        print(f"Malayalam font not found at {malayalam_font_path}, using Helvetica")
+        return "Helvetica"
+    try:
+        pdfmetrics.registerFont(TTFont("NotoSansMalayalam", malayalam_font_path))
+    except Exception as e:
+        print(f"Could not register Malayalam font: {e}, using Helvetica")
+        return "Helvetica"
+    print(f"Using Malayalam font: NotoSansMalayalam from {malayalam_font_path}")
+    return "NotoSansMalayalam"
+
+# Any character from the Malayalam Unicode block
+MALAYALAM_PATTERN = re.compile(r'[\u0D00-\u0D7F]')
+
+# Models are loaded once per process and shared by every HandwrittenOCR / DocumentClassifier,
+# so constructing one per request no longer reloads TrOCR or the spaCy pipeline
+_TROCR = None
+_SPACY_PIPELINES = {}
+_MODEL_LOCK = threading.Lock()
+
+def get_trocr():
+    """Returns the shared (processor, model, device, dtype) for microsoft/trocr-base-handwritten."""
+    global _TROCR
+    if _TROCR is None:
+        with _MODEL_LOCK:
+            if _TROCR is None:
+                # Half precision on the GPU uses its tensor cores; on the CPU fp16 is slower, so stay in fp32
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                dtype = torch.float16 if device == "cuda" else torch.float32
+                processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-handwritten")
+                model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-handwritten", torch_dtype=dtype).to(device).eval()
+                _TROCR = (processor, model, device, dtype)
+    return _TROCR
+
+def get_spacy_nlp(model: str = "en_core_web_sm"):
+    """Returns the shared spaCy pipeline for `model`, loaded with only the components the classifier uses."""
+    nlp = _SPACY_PIPELINES.get(model)
+    if nlp is None:
+        with _MODEL_LOCK:
+            nlp = _SPACY_PIPELINES.get(model)
+            if nlp is None:
+                nlp = spacy.load(model, disable=["tagger", "parser", "attribute_ruler", "lemmatizer"])
+                _SPACY_PIPELINES[model] = nlp
+    return nlp
+
+def extract_pdf_text(pdf_path: str) -> str:
+    """
+    Extracts the text layer of a PDF, one page after another, each page followed by a newline.
+
+    PyMuPDF parses pages in C and is several times faster than PyPDF2 or pdfplumber,
+    which is more than fanning those out over worker processes would gain.
+    """
+    parts = []
+    with fitz.open(pdf_path) as pdf:
+        for page in pdf:
+            # sort=True returns blocks in reading order (top-left to bottom-right)
+            page_text = page.get_text(sort=True)
+            if page_text.strip():
+                parts.append(page_text.rstrip("\n") + "\n")
+    return "".join(parts)
+
 class HandwrittenOCR:
-    def __init__(self, tesseract_path: str = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"):
+    def __init__(self, tesseract_path: str = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe", batch_size: int = 8):
         pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        # Pages per TrOCR forward pass / generate() call
+        self.batch_size = batch_size
+
+        self.processor, self.model, self.device, self.dtype = get_trocr()
 
-        self.processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-handwritten")
-        self.model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-handwritten")
+        # TrOCR's image preprocessing (resize, rescale, normalize), done for a whole batch
+        # with numpy; the parameters come from its image processor so the inputs are unchanged
+        image_processor = self.processor.image_processor
+        self._input_size = (image_processor.size["width"], image_processor.size["height"])
+        self._resample = image_processor.resample
+        self._rescale = np.float32(image_processor.rescale_factor)
+        self._mean = np.asarray(image_processor.image_mean, dtype=np.float32)
+        self._std = np.asarray(image_processor.image_std, dtype=np.float32)
 
     def _recognize_english(self, img_crop):
-        pixel_values = self.processor(images=img_crop, return_tensors="pt").pixel_values
-        generated_ids = self.model.generate(pixel_values)
-        return self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+        return self._recognize_english_batch([img_crop])[0]
+
+    def _pixel_values(self, images):
+        """Returns the (batch, 3, height, width) TrOCR input for RGB PIL images."""
+        batch = np.stack([np.asarray(img.resize(self._input_size, resample=self._resample), dtype=np.float32) for img in images])
+        batch = (batch * self._rescale - self._mean) / self._std
+        return torch.from_numpy(batch).permute(0, 3, 1, 2).contiguous()
+
+    def _ink_ratio(self, img):
+        """Share of dark pixels on a downsampled grayscale copy: a cheap estimate of how much text a page holds."""
+        return float((np.asarray(img.convert("L").reduce(8)) < 128).mean())
+
+    def _recognize_english_batch(self, images):
+        # Every image is resized to the same size, so pages stack into one tensor
+        # and each generate() call decodes batch_size pages together.
+        # A batch decodes until its longest page is done, so pages with a similar amount
+        # of ink are batched together and the results are put back in page order.
+        order = list(range(len(images)))
+        if len(images) > self.batch_size:
+            order.sort(key=lambda i: self._ink_ratio(images[i]))
+
+        texts = [None] * len(images)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            pixel_values = self._pixel_values([images[i] for i in batch])
+            pixel_values = pixel_values.to(self.device, self.dtype)
+            with torch.inference_mode():
+                generated_ids = self.model.generate(pixel_values)
+            for i, text in zip(batch, self.processor.batch_decode(generated_ids, skip_special_tokens=True)):
+                texts[i] = text
+        return texts
 
     def _recognize_malayalam(self, img_crop):
         return pytesseract.image_to_string(img_crop, lang="mal")
 
     def _contains_malayalam(self, text):
-        return bool(re.search(r'[\u0D00-\u0D7F]', text))
+        return MALAYALAM_PATTERN.search(text) is not None
+
+    def _recognize_pages(self, images):
+        # Pages seen before (the same scan uploaded again) are answered from the cache
+        keys = [_image_key(img) for img in images]
+        with _OCR_CACHE_LOCK:
+            texts = [_OCR_CACHE.get(key) for key in keys]
+            for key, text in zip(keys, texts):
+                if text is not None:
+                    _OCR_CACHE.move_to_end(key)
+
+        pending = [i for i, text in enumerate(texts) if text is None]
+        if pending:
+            recognized = self._ocr_pages([images[i] for i in pending])
+            with _OCR_CACHE_LOCK:
+                for i, text in zip(pending, recognized):
+                    texts[i] = text
+                    _OCR_CACHE[keys[i]] = text
+                    _OCR_CACHE.move_to_end(keys[i])
+                while len(_OCR_CACHE) > OCR_CACHE_SIZE:
+                    _OCR_CACHE.popitem(last=False)
+        return texts
+
+    def _ocr_pages(self, images):
+        # Tesseract is the cheap pass, so it runs first and doubles as the language probe.
+        # Each page is a tesseract subprocess, so pages run in threads.
+        with ThreadPoolExecutor(max_workers=min(len(images), os.cpu_count() or 1)) as executor:
+            texts = [text.strip() for text in executor.map(self._recognize_malayalam, images)]
+
+        # Only pages without Malayalam script need the much slower TrOCR decode
+        english_pages = [i for i, text_ml in enumerate(texts) if not (text_ml and self._contains_malayalam(text_ml))]
+        texts_en = self._recognize_english_batch([images[i] for i in english_pages])
+        for i, text_en in zip(english_pages, texts_en):
+            texts[i] = text_en.strip() or texts[i]
+        return texts
+
+    def process_image(self, image_path: str) -> str:
+        pil_img = _as_rgb(Image.open(image_path))
+        return self._recognize_pages([pil_img])[0]
 
     def process_pdf(self, pdf_path: str) -> str:
-        images = convert_from_path(pdf_path, dpi=200)
-        full_text = []
-
-        for page_num, pil_img in enumerate(images, start=1):
-            pil_img = pil_img.convert("RGB")
-
-            text_en = self._recognize_english(pil_img).strip()
-            text_ml = self._recognize_malayalam(pil_img).strip()
-
-            if text_ml and self._contains_malayalam(text_ml):
-                chosen_text = text_ml
-            elif text_en:
-                chosen_text = text_en
-            else:
-                chosen_text = text_en if len(text_en) >= len(text_ml) else text_ml
+        images = [_as_rgb(pil_img) for pil_img in convert_from_path(pdf_path, dpi=200)]
+        if not images:
+            return ""
 
+        full_text = []
+        for page_num, chosen_text in enumerate(self._recognize_pages(images), start=1):
             full_text.append(f"--- Page {page_num} ---\n{chosen_text}\n")
 
         return "\n".join(full_text)
     
     def save_to_pdf(self, text: str, output_path: str = "ocr_output.pdf") -> None:
-        pdfmetrics.registerFont(UnicodeCIDFont("HeiseiMin-W3"))
+        register_cid_font("HeiseiMin-W3")
         doc = SimpleDocTemplate(output_path, pagesize=A4)
         styles = getSampleStyleSheet()
         custom_style = ParagraphStyle("Custom", parent=styles["Normal"], fontName="HeiseiMin-W3", fontSize=12)
@@ -116,50 +276,94 @@ class HandwrittenOCR:
         self.save_to_pdf(text, output_path)
         return text
 
+# Translated chunks keyed by a hash of (source, target, chunk text), least recently used first.
+# Shared by every PDFTranslator, so repeated headers, footers and clauses are translated once per process.
+TRANSLATION_CACHE_SIZE = 4096
+_TRANSLATION_CACHE = OrderedDict()
+_TRANSLATION_CACHE_LOCK = threading.Lock()
+
+def _translation_key(src_lang: str, dest_lang: str, chunk: str) -> str:
+    return hashlib.blake2b(f"{src_lang}|{dest_lang}|{chunk}".encode("utf-8"), digest_size=16).hexdigest()
+
 class PDFTranslator:
-    def __init__(self, chunk_size: int = 4500):
+    def __init__(self, chunk_size: int = 4500, max_workers: int = 8):
         self.chunk_size = chunk_size
+        # Chunks translated concurrently; kept modest to stay under Google's rate limit
+        self.max_workers = max_workers
 
     def extract_text_from_pdf(self, pdf_path: str) -> str:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        return text
+        return extract_pdf_text(pdf_path)
+
+    # URLs and email addresses are swapped for placeholders so the translator leaves them alone
+    LINK_PATTERN = re.compile(r"(https?://\S+|www\.\S+|[\w\.-]+@[\w\.-]+\.\w+)")
+    # The translator may change the case of a placeholder, so it is matched case-insensitively
+    PLACEHOLDER_PATTERN = re.compile(r"§§LINK(\d+)§§", re.IGNORECASE)
 
     def _protect_links(self, text: str):
-        link_pattern = re.compile(r"(https?://\S+|www\.\S+|[\w\.-]+@[\w\.-]+\.\w+)")
         links = {}
         def replacer(match):
             placeholder = f"§§LINK{len(links)}§§"
             links[placeholder] = match.group(0)
             return placeholder
-        protected_text = link_pattern.sub(replacer, text)
+        protected_text = self.LINK_PATTERN.sub(replacer, text)
         return protected_text, links
 
     def _restore_links(self, text: str, links: dict) -> str:
-        for placeholder, link in links.items():
-            pattern = re.compile(re.escape(placeholder), re.IGNORECASE)
-            link_markup = f'<a href="{link}" color="blue"><u>{link}</u></a>'
-            text = pattern.sub(link_markup, text)
-        return text
+        # One pass over the text for all placeholders instead of one compiled regex per link
+        def replacer(match):
+            link = links.get(f"§§LINK{match.group(1)}§§")
+            if link is None:
+                return match.group(0)
+            return f'<a href="{link}" color="blue"><u>{link}</u></a>'
+        return self.PLACEHOLDER_PATTERN.sub(replacer, text)
 
     def translate_text(self, text: str, src_lang: str, dest_lang: str) -> str:
         protected_text, links = self._protect_links(text)
         lines = protected_text.splitlines()
-        translated_lines = []
-        current_chunk = ""
+        chunks = []
+        # Lines of the chunk being built and its length, joined once the chunk is full
+        current_chunk = []
+        current_len = 0
         for line in lines:
-            if len(current_chunk) + len(line) + 1 > self.chunk_size:
-                translated_chunk = GoogleTranslator(source=src_lang, target=dest_lang).translate(current_chunk)
-                translated_lines.append(translated_chunk)
-                current_chunk = ""
-            current_chunk += line + "\n"
-        if current_chunk.strip():
-            translated_chunk = GoogleTranslator(source=src_lang, target=dest_lang).translate(current_chunk)
-            translated_lines.append(translated_chunk)
+            if current_len + len(line) + 1 > self.chunk_size:
+                chunks.append("".join(current_chunk))
+                current_chunk = []
+                current_len = 0
+            current_chunk.append(line + "\n")
+            current_len += len(line) + 1
+        if current_chunk:
+            last_chunk = "".join(current_chunk)
+            if last_chunk.strip():
+                chunks.append(last_chunk)
+
+        # GoogleTranslator keeps the request parameters on the instance, so it cannot be shared
+        # between threads; each worker builds one and reuses it for all of its chunks
+        local = threading.local()
+
+        def translate_chunk(chunk):
+            key = _translation_key(src_lang, dest_lang, chunk)
+            with _TRANSLATION_CACHE_LOCK:
+                cached = _TRANSLATION_CACHE.get(key)
+                if cached is not None:
+                    _TRANSLATION_CACHE.move_to_end(key)
+                    return cached
+
+            if not hasattr(local, "translator"):
+                local.translator = GoogleTranslator(source=src_lang, target=dest_lang)
+            translated = local.translator.translate(chunk)
+
+            if translated is not None:
+                with _TRANSLATION_CACHE_LOCK:
+                    _TRANSLATION_CACHE[key] = translated
+                    _TRANSLATION_CACHE.move_to_end(key)
+                    while len(_TRANSLATION_CACHE) > TRANSLATION_CACHE_SIZE:
+                        _TRANSLATION_CACHE.popitem(last=False)
+            return translated
+
+        # Each chunk is a separate HTTP round trip, so they are sent concurrently;
+        # map() keeps the results in document order
+        with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), self.max_workers))) as executor:
+            translated_lines = list(executor.map(translate_chunk, chunks))
 
         translated_text = "\n".join(translated_lines)
         return self._restore_links(translated_text, links)
@@ -169,38 +373,13 @@ class PDFTranslator:
         from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
         from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
         from reportlab.lib.pagesizes import A4
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
-        import os
         
         doc = SimpleDocTemplate(output_pdf_path, pagesize=A4,
                                 rightMargin=40, leftMargin=40,
                                 topMargin=50, bottomMargin=50)
         styles = getSampleStyleSheet()
         
-        # Try to register Malayalam font if available, otherwise use default
-        font_name = "Helvetica"  # Default font
-        try:
-            # Check if Malayalam font is available - use absolute path
-            malayalam_font_path = os.path.abspath("NotoSansMalayalam-Regular.ttf")
-            if os.path.exists(malayalam_font_path):
-                # Register the font with a unique name
-                pdfmetrics.registerFont(TTFont('NotoSansMalayalam', malayalam_font_path))
-                font_name = "NotoSansMalayalam"
-                print(f"Using Malayalam font: {font_name} from {malayalam_font_path}")
-                
-                # Test if the font is properly registered
-                try:
-                    test_style = ParagraphStyle("Test", fontName=font_name, fontSize=12)
-                    print(f"Font registration successful: {font_name}")
-                except Exception as test_e:
-                    print(f"Font test failed: {test_e}, falling back to Helvetica")
-                    font_name = "Helvetica"
-            else:
-                print(f"Malayalam font not found at {malayalam_font_path}, using Helvetica")
-        except Exception as e:
-            print(f"Could not register Malayalam font: {e}, using Helvetica")
-            font_name = "Helvetica"
+        font_name = register_malayalam_font()
         
         # Create a style with black text color and appropriate font
         normal_style = ParagraphStyle(
@@ -234,32 +413,115 @@ class PDFTranslator:
         self.write_text_to_pdf(translated, output_pdf)
         return translated
 
+# Phrase rules per department, in the order classify_department applies them:
+# (reason, weight, per_hit, phrases). A per_hit rule adds weight for every phrase found and
+# reports the count; the others add weight once when any of their phrases is found.
+DEPARTMENT_PHRASE_RULES = {
+    "Procurement": (
+        ("procurement_phrase_hits", 1.2, True, (
+            "tender document", "notice inviting tender", "form of tender",
+            "bill of quantities", "tender security", "tenderer", "earnest money",
+            "emd", "bid", "bidder", "purchase order", "contract no",
+            "evaluation of tender", "tender opening", "tender validity",
+        )),
+        ("strong_proc_indicator_phrase", 3.0, False, ("notice inviting tender", "form of tender", "bill of quantities")),
+    ),
+    "Legal": (
+        ("legal_phrase_hits", 0.8, True, (
+            "petitioner", "respondent", "writ petition", "tribunal order", "appeal", "arbitration clause",
+        )),
+    ),
+    "Finance": (
+        ("tax_term_found", 3.0, False, ("tax reimbursement", "tax return", "tax refund")),
+        ("financial_statement_found", 2.0, False, ("annual report", "balance sheet", "audited")),
+        ("invoice_found", 1.5, False, ("invoice",)),
+        ("p&l_found", 2.0, False, ("profit and loss", "p&l account")),
+        ("budget_terms_found", 1.5, False, ("budget estimate", "expenditure report")),
+    ),
+    "Regulatory": (
+        ("environmental_found", 3.0, False, ("eia", "environmental impact", "environmental clearance")),
+        ("safety_directive_found", 1.5, False, ("safety directive", "safety norms")),
+        ("regulatory_directive_found", 2.0, False, ("compliance order", "regulatory directive")),
+    ),
+    "Engineering": (
+        ("rolling_stock_or_maximo", 3.0, False, ("rolling stock", "maximo")),
+        ("technical_terms_found", 1.5, False, ("technical specification", "engineering report")),
+    ),
+}
+
 class DocumentClassifier:
-    def __init__(self):
-        self.nlp = spacy.load("en_core_web_trf")
+    # Token regexes, matched like the Matcher's {"TEXT": {"REGEX": ...}}: a token counts when the
+    # pattern is found inside its text. They are run over doc.text in C instead of once per token.
+    TOKEN_PATTERNS = {
+        # HR Patterns
+        "RECRUITMENT_ADV_NO": re.compile(r"HR/\d{4}/\d+"),
+        "GRADE_PAY": re.compile(r"Grade\s?[A-Z0-9]+"),
+        # Procurement Patterns
+        "TENDER_ID": re.compile(r"Tender\s?No\.\s?\d+/\d+"),
+        "PURCHASE_ORDER_NO": re.compile(r"PO\s?\d{3,}"),
+        "CONTRACT_ID": re.compile(r"Contract\s?No\.\s?\w+"),
+        # Legal Patterns
+        "CASE_NO": re.compile(r"(W\.P\.|C\.R\.|O\.S\.)\s?\d+/\d+"),
+        "LAW_SECTION": re.compile(r"(Section|Article)\s?\d+[A-Za-z]?"),
+    }
+
+    # Every phrase classify_department checks for, found with one Aho-Corasick pass over the text
+    KEYWORD_PHRASES = tuple(dict.fromkeys(
+        phrase for rules in DEPARTMENT_PHRASE_RULES.values() for _, _, _, phrases in rules for phrase in phrases
+    ))
+
+    # Texts are run through spaCy in slices of at most this many characters, which bounds
+    # the memory of a single doc on very long PDFs
+    NLP_SLICE_CHARS = 100_000
+
+    def __init__(self, use_trf: bool = False):
+        # Only NER and token text are used (doc.ents plus the matchers). The small CNN pipeline
+        # finds the same PERSON/ORG/DATE entities well enough for keyword-weighted scoring at a
+        # fraction of the transformer's cost; use_trf=True loads en_core_web_trf instead.
+        self.nlp = get_spacy_nlp("en_core_web_trf" if use_trf else "en_core_web_sm")
         self.matcher = Matcher(self.nlp.vocab)
         self._add_patterns()
 
+        self.keyword_automaton = ahocorasick.Automaton()
+        for phrase in self.KEYWORD_PHRASES:
+            self.keyword_automaton.add_word(phrase, phrase)
+        self.keyword_automaton.make_automaton()
+
     def _add_patterns(self):
         # HR Patterns
-        self.matcher.add("RECRUITMENT_ADV_NO", [[{"TEXT": {"REGEX": r"HR/\d{4}/\d+"}}]])
-        self.matcher.add("GRADE_PAY", [[{"TEXT": {"REGEX": r"Grade\s?[A-Z0-9]+"}}]])
         self.matcher.add("JOB_TITLE", [[{"LOWER": {"IN": ["engineer", "manager", "officer", "assistant"]}}]])
 
-        # Procurement Patterns
-        self.matcher.add("TENDER_ID", [[{"TEXT": {"REGEX": r"Tender\s?No\.\s?\d+/\d+"}}]])
-        self.matcher.add("PURCHASE_ORDER_NO", [[{"TEXT": {"REGEX": r"PO\s?\d{3,}"}}]])
-        self.matcher.add("CONTRACT_ID", [[{"TEXT": {"REGEX": r"Contract\s?No\.\s?\w+"}}]])
-
         # Legal Patterns
-        self.matcher.add("CASE_NO", [[{"TEXT": {"REGEX": r"(W\.P\.|C\.R\.|O\.S\.)\s?\d+/\d+"}}]])
         self.matcher.add("COURT_NAME", [[{"LOWER": {"IN": ["supreme", "high", "district", "tribunal"]}}]])
-        self.matcher.add("LAW_SECTION", [[{"TEXT": {"REGEX": r"(Section|Article)\s?\d+[A-Za-z]?"}}]])
+
+    def _match_token_patterns(self, doc):
+        """Yields (label, one-token span) for every token whose text contains a TOKEN_PATTERNS match."""
+        for label, pattern in self.TOKEN_PATTERNS.items():
+            seen = set()
+            for match in pattern.finditer(doc.text):
+                span = doc.char_span(match.start(), match.end(), alignment_mode="expand")
+                # Matches spanning whitespace cover several tokens, which a token pattern never matches
+                if span is not None and len(span) == 1 and span.start not in seen:
+                    seen.add(span.start)
+                    yield label, span
+
+    def _slices(self, text):
+        """Splits text into pieces of at most NLP_SLICE_CHARS, cutting at line breaks where possible."""
+        slices = []
+        start = 0
+        while len(text) - start > self.NLP_SLICE_CHARS:
+            end = text.rfind("\n", start, start + self.NLP_SLICE_CHARS)
+            if end <= start:
+                end = start + self.NLP_SLICE_CHARS
+            slices.append(text[start:end])
+            start = end
+        slices.append(text[start:])
+        return slices
 
     def extract_metadata(self, text):
-        doc = self.nlp(text)
-        matches = self.matcher(doc)
+        return self._metadata_from_docs(self.nlp.pipe(self._slices(text)))
 
+    def _metadata_from_docs(self, docs):
         metadata = {
             "general": {"PERSON": [], "ORG": [], "DATE": [], "AMOUNT": [], "LOCATION": []},
             "HR": {"EMPLOYEE_ID": [], "JOB_TITLE": [], "GRADE_PAY": [], "RECRUITMENT_ADV_NO": []},
@@ -267,21 +529,41 @@ class DocumentClassifier:
             "Legal": {"CASE_NO": [], "COURT_NAME": [], "LAW_SECTION": [], "PARTY_NAME": [], "SOP_CLAUSE": []},
         }
 
-        for ent in doc.ents:
-            if ent.label_ in metadata["general"]:
-                metadata["general"][ent.label_].append(ent.text)
+        for doc in docs:
+            for ent in doc.ents:
+                if ent.label_ in metadata["general"]:
+                    metadata["general"][ent.label_].append(ent.text)
 
-        for match_id, start, end in matches:
-            label = self.nlp.vocab.strings[match_id]
-            span = doc[start:end].text
-            for dept in metadata:
-                if label in metadata[dept]:
-                    metadata[dept][label].append(span)
+            found = [(self.nlp.vocab.strings[match_id], doc[start:end]) for match_id, start, end in self.matcher(doc)]
+            found.extend(self._match_token_patterns(doc))
+            for label, span in sorted(found, key=lambda item: item[1].start):
+                for dept in metadata:
+                    if label in metadata[dept]:
+                        metadata[dept][label].append(span.text)
 
         return metadata
 
+    def _find_phrases(self, text):
+        """Returns the KEYWORD_PHRASES that occur in text, with the same substring semantics as `phrase in text`."""
+        return {phrase for _, phrase in self.keyword_automaton.iter(text)}
+
+    def _score_phrases(self, dept, found, raw, reasons):
+        """Adds the DEPARTMENT_PHRASE_RULES of dept whose phrases are in found to raw and reasons."""
+        for reason, weight, per_hit, phrases in DEPARTMENT_PHRASE_RULES[dept]:
+            hits = sum(1 for phrase in phrases if phrase in found)
+            if not hits:
+                continue
+            if per_hit:
+                raw[dept] += hits * weight
+                reasons[dept].append(f"{reason}={hits}")
+            else:
+                raw[dept] += weight
+                reasons[dept].append(reason)
+
     def classify_department(self, metadata, full_text=""):
         text = (full_text or "").lower()
+        # Every keyword below is tested against this set of the phrases present in the text
+        found = self._find_phrases(text)
         raw = defaultdict(float)
         reasons = defaultdict(list)
 
@@ -291,23 +573,11 @@ class DocumentClassifier:
             + len(metadata["Procurement"]["PURCHASE_ORDER_NO"])
             + len(metadata["Procurement"]["CONTRACT_ID"])
         )
-        procurement_phrases = [
-            "tender document", "notice inviting tender", "form of tender",
-            "bill of quantities", "tender security", "tenderer", "earnest money",
-            "emd", "bid", "bidder", "purchase order", "contract no",
-            "evaluation of tender", "tender opening", "tender validity"
-        ]
-        proc_kw_hits = sum(1 for kw in procurement_phrases if kw in text)
 
         if proc_matches:
             raw["Procurement"] += proc_matches * 3.0
             reasons["Procurement"].append(f"explicit_proc_matches={proc_matches}")
-        if proc_kw_hits:
-            raw["Procurement"] += proc_kw_hits * 1.2
-            reasons["Procurement"].append(f"procurement_phrase_hits={proc_kw_hits}")
-        if any(k in text for k in ["notice inviting tender", "form of tender", "bill of quantities"]):
-            raw["Procurement"] += 3.0
-            reasons["Procurement"].append("strong_proc_indicator_phrase")
+        self._score_phrases("Procurement", found, raw, reasons)
 
         # HR
         if metadata["HR"]["RECRUITMENT_ADV_NO"]:
@@ -331,47 +601,11 @@ class DocumentClassifier:
             raw["Legal"] += len(metadata["Legal"]["LAW_SECTION"]) * 0.6
             reasons["Legal"].append("LAW_SECTION_found")
 
-        legal_phrases = ["petitioner", "respondent", "writ petition", "tribunal order", "appeal", "arbitration clause"]
-        legal_phrase_hits = sum(1 for k in legal_phrases if k in text)
-        if legal_phrase_hits:
-            raw["Legal"] += legal_phrase_hits * 0.8
-            reasons["Legal"].append(f"legal_phrase_hits={legal_phrase_hits}")
+        self._score_phrases("Legal", found, raw, reasons)
 
-        # Finance
-        if "tax reimbursement" in text or "tax return" in text or "tax refund" in text:
-            raw["Finance"] += 3.0
-            reasons["Finance"].append("tax_term_found")
-        if "annual report" in text or "balance sheet" in text or "audited" in text:
-            raw["Finance"] += 2.0
-            reasons["Finance"].append("financial_statement_found")
-        if "invoice" in text:
-            raw["Finance"] += 1.5
-            reasons["Finance"].append("invoice_found")
-        if "profit and loss" in text or "p&l account" in text:
-            raw["Finance"] += 2.0
-            reasons["Finance"].append("p&l_found")
-        if "budget estimate" in text or "expenditure report" in text:
-            raw["Finance"] += 1.5
-            reasons["Finance"].append("budget_terms_found")
-
-        # Regulatory
-        if "eia" in text or "environmental impact" in text or "environmental clearance" in text:
-            raw["Regulatory"] += 3.0
-            reasons["Regulatory"].append("environmental_found")
-        if "safety directive" in text or "safety norms" in text:
-            raw["Regulatory"] += 1.5
-            reasons["Regulatory"].append("safety_directive_found")
-        if "compliance order" in text or "regulatory directive" in text:
-            raw["Regulatory"] += 2.0
-            reasons["Regulatory"].append("regulatory_directive_found")
-
-        # Engineering
-        if "rolling stock" in text or "maximo" in text:
-            raw["Engineering"] += 3.0
-            reasons["Engineering"].append("rolling_stock_or_maximo")
-        if "technical specification" in text or "engineering report" in text:
-            raw["Engineering"] += 1.5
-            reasons["Engineering"].append("technical_terms_found")
+        # Finance, Regulatory and Engineering are scored on phrases alone
+        for dept in ("Finance", "Regulatory", "Engineering"):
+            self._score_phrases(dept, found, raw, reasons)
 
         # Dominance/Suppression
         if raw["Procurement"] >= 3.0:
@@ -418,16 +652,23 @@ class DocumentClassifier:
         return predicted_departments
 
     def extract_text_from_pdf(self, pdf_path):
-        text = ""
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        return text
+        return extract_pdf_text(pdf_path)
 
-    def process_pdf(self, pdf_path):
-        text = self.extract_text_from_pdf(pdf_path)
+    def process_text(self, text):
         metadata = self.extract_metadata(text)
         predicted = self.classify_department(metadata, full_text=text)
-        return metadata, predicted
\ No newline at end of file
+        return metadata, predicted
+
+    def classify_batch(self, texts):
+        """Same as process_text for several texts, with every slice of every text run through one nlp.pipe()."""
+        slices = [self._slices(text) for text in texts]
+        docs = self.nlp.pipe((piece for pieces in slices for piece in pieces), batch_size=32)
+        results = []
+        for text, pieces in zip(texts, slices):
+            metadata = self._metadata_from_docs(list(itertools.islice(docs, len(pieces))))
+            results.append((metadata, self.classify_department(metadata, full_text=text)))
+        return results
+
+    def process_pdf(self, pdf_path):
+        text = self.extract_text_from_pdf(pdf_path)
+        return self.process_text(text)
\ No newline at end of file
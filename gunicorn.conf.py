@@ -0,0 +1,46 @@
+# gunicorn.conf.py
+# Production server settings, picked up automatically by `gunicorn app:app`.
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5001")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+# Threads let one worker keep serving while a request waits on Gemini or Postgres
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# RAG answers and uploads can take longer than the 30 s default
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Import the app once in the master and fork workers from it, so imported modules
+# (and the question embedder loaded in when_ready) are shared copy-on-write
+preload_app = True
+
+
+def when_ready(server):
+    """Loads bge-m3, the classifier's spaCy pipeline and TrOCR in the master before the workers are forked."""
+    import torch
+    from functions import get_spacy_nlp, get_trocr
+    # spaCy runs on the CPU either way
+    server.log.info("Loading the document classifier before forking workers")
+    get_spacy_nlp()
+    # CUDA cannot be used across fork; GPU hosts load the torch models lazily in each worker instead
+    if torch.cuda.is_available():
+        return
+    from Model_rag.query import _get_text_embedder
+    server.log.info("Loading the question embedder and TrOCR before forking workers")
+    _get_text_embedder()
+    get_trocr()
+
+
+def pre_fork(server, worker):
+    # Move everything the master imported out of the collector's reach: collections in the
+    # workers then neither scan those objects nor dirty their copy-on-write pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Every worker runs several request threads; one torch thread each avoids
+    # workers * threads * cores threads competing for the same cores
+    import torch
+    torch.set_num_threads(1)
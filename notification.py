@@ -2,6 +2,8 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_mail import Mail, Message
 import os
+import mimetypes
+import threading
 
 app = Flask(__name__)
 CORS(app)
@@ -20,6 +22,24 @@ mail = Mail(app)
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+def _send_document(recipient_email, filename, file_path):
+    """Builds and sends the notification email; runs on a background thread, outside the request."""
+    with app.app_context():
+        try:
+            msg = Message(
+                subject="You received a new document",
+                recipients=[recipient_email]
+            )
+            msg.html = f"<p>Hello,</p><p>You have received a new document: {filename}</p>"
+
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            with open(file_path, "rb") as f:
+                msg.attach(filename, content_type, f.read())
+
+            mail.send(msg)
+        except Exception as e:
+            print(f"Error sending email to {recipient_email}: {e}")
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
@@ -34,22 +54,9 @@ def upload_file():
     file_path = os.path.join(UPLOAD_FOLDER, file.filename)
     file.save(file_path)
 
-    try:
-        
-        msg = Message(
-            subject="You received a new document",
-            recipients=[recipient_email]
-        )
-        msg.html = f"<p>Hello,</p><p>You have received a new document: {file.filename}</p>"
-       
-        with open(file_path, "rb") as f:
-            msg.attach(file.filename, "application/octet-stream", f.read())
-
-        mail.send(msg)
-        return jsonify({'message': 'File uploaded and email sent successfully'}), 200
-    except Exception as e:
-        print(e)
-        return jsonify({'message': 'Error sending email'}), 500
+    # SMTP can take seconds; the email is sent in the background and the upload answers right away
+    threading.Thread(target=_send_document, args=(recipient_email, file.filename, file_path), daemon=True).start()
+    return jsonify({'message': 'File uploaded, email is being sent'}), 202
 
 if __name__ == '__main__':
     app.run(port=5001, debug=True)
@@ -1,10 +1,16 @@
-import bcrypt
 from flask import Blueprint, request, jsonify, current_app, make_response
 from utils.supabase import supabase
 from utils.jwt_utils import generate_jwt_token, verify_jwt_token
+from utils.password import hash_password, verify_password, needs_rehash
 
 auth_bp = Blueprint("auth", __name__)
 
+# The auth cookie's attributes never change, so its Set-Cookie header is formatted once
+# instead of by set_cookie on every login/logout. JWTs are base64url and dots: no quoting needed.
+AUTH_COOKIE_MAX_AGE = 86400
+AUTH_COOKIE_TEMPLATE = f"auth_token={{token}}; Max-Age={AUTH_COOKIE_MAX_AGE}; Secure; HttpOnly; Path=/; SameSite=Lax"
+CLEAR_AUTH_COOKIE = "auth_token=; Expires=Thu, 01 Jan 1970 00:00:00 GMT; Max-Age=0; Secure; HttpOnly; Path=/; SameSite=Lax"
+
 @auth_bp.route("/signup", methods=["POST"])
 def signup():
     data = request.json
@@ -16,7 +22,14 @@ def signup():
     if not email or not password or not name:
         return jsonify({"error": "Email, name, and password are required"}), 400
 
-    hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    email = email.strip().lower()
+
+    # Checked before hashing, so a duplicate signup does not pay for a password hash
+    existing = supabase.table("users").select("id").eq("email", email).limit(1).execute()
+    if existing.data:
+        return jsonify({"error": "User already exists"}), 409
+
+    hashed_pw = hash_password(password)
 
     try:
         res = supabase.table("users").insert({
@@ -43,7 +56,10 @@ def login():
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
 
-    res = supabase.table("users").select("*").eq("email", email).execute()
+    email = email.strip().lower()
+
+    # Only the columns the token and response need; users_email_idx (sql/users_email_index.sql) serves the lookup
+    res = supabase.table("users").select("id, email, name, role, password").eq("email", email).limit(1).execute()
 
     if not res.data:
         return jsonify({"error": "Invalid email or password"}), 401
@@ -51,15 +67,16 @@ def login():
     user = res.data[0]
     stored_password = user["password"]
 
-    if stored_password.startswith("$2b$"):
-        if bcrypt.checkpw(password.encode("utf-8"), stored_password.encode("utf-8")):
-            password_valid = True
-        else:
-            password_valid = False
-    else:
-        password_valid = (password == stored_password)
+    password_valid = verify_password(stored_password, password)
 
     if password_valid:
+        # Legacy bcrypt/plain-text rows are upgraded to Argon2id while the password is at hand
+        if needs_rehash(stored_password):
+            try:
+                supabase.table("users").update({"password": hash_password(password)}).eq("id", user["id"]).execute()
+            except Exception as e:
+                print(f"Password rehash failed for user {user['id']}: {e}")
+
         token = generate_jwt_token(user)
         
         response_data = {
@@ -74,14 +91,7 @@ def login():
         
         response = make_response(jsonify(response_data), 200)
         
-        response.set_cookie(
-            'auth_token',
-            token,
-            max_age=86400,
-            httponly=True,
-            secure=True,
-            samesite='Lax'
-        )
+        response.headers.add("Set-Cookie", AUTH_COOKIE_TEMPLATE.format(token=token))
         
         return response
     else:
@@ -91,14 +101,7 @@ def login():
 def logout():
     response = make_response(jsonify({"message": "Logout successful"}), 200)
     
-    response.set_cookie(
-        'auth_token',
-        '',
-        max_age=0,
-        httponly=True,
-        secure=True,
-        samesite='Lax'
-    )
+    response.headers.add("Set-Cookie", CLEAR_AUTH_COOKIE)
     
     return response
 
@@ -1,13 +1,15 @@
 import os
-import hashlib
 import uuid
-import re
 import tempfile
-import mimetypes
 import requests
+from requests.adapters import HTTPAdapter
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, jsonify
 from utils.supabase import supabase
+from utils.files import calculate_file_hashes, sanitize_filename, is_pdf_file
+from utils.background import run_document_job, BatchQueue
 from functions import convert_to_pdf, HandwrittenOCR, DocumentClassifier
 from transformers import AutoImageProcessor, AutoModelForImageClassification
 from pdf2image import convert_from_path
@@ -17,16 +19,11 @@ from Model_rag.query import summarizer
 
 docs_bp = Blueprint("documents", __name__)
 
-def calculate_file_hash(file):
-    sha256 = hashlib.sha256()
-    for chunk in iter(lambda: file.read(4096), b""):
-        sha256.update(chunk)
-    file.seek(0)
-    return sha256.hexdigest()
-
-def sanitize_filename(filename):
-    # Keep only safe chars for storage 
-    return re.sub(r'[^a-zA-Z0-9_\-\.]', '_', filename)
+# Shared session: downloads from the storage host reuse kept-alive connections
+# instead of a new DNS lookup and TLS handshake per document
+_HTTP = requests.Session()
+_HTTP.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+DOWNLOAD_TIMEOUT = 30
 
 def is_handwritten_file(file):
 
@@ -40,44 +37,49 @@ def is_handwritten_file(file):
     #     predicted_class = outputs.logits.argmax(-1).item()
     return False
 
-def is_pdf_file(file):
-    """Check if the file is already a PDF"""
-    mime_type, _ = mimetypes.guess_type(file.filename)
-    return mime_type == 'application/pdf'
-
 def process_uploaded_file(file, is_handwritten=False):
     """Process the uploaded file based on its type"""
+    temp_input = None
+    temp_output = None
     try:
-        # Create temporary files
-        temp_input = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1])
-        temp_output = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+        # Create temporary files; only the paths are used, so the handles are closed right away
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
+            temp_output = tmp.name
+
+        if not is_handwritten and is_pdf_file(file):
+            # Already a PDF: save the upload straight to the output, no scratch copy
+            file.save(temp_output)
+            file.seek(0)  # Reset file pointer
+            return temp_output, "pdf_original"
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
+            temp_input = tmp.name
 
         # Save uploaded file to temp location
-        file.save(temp_input.name)
+        file.save(temp_input)
         file.seek(0)  # Reset file pointer
 
         if is_handwritten:
             ocr = HandwrittenOCR()
-            text = ocr.process_pdf(temp_input.name)
+            text = ocr.process_pdf(temp_input)
 
-            ocr.save_to_pdf(text, temp_output.name)
-            return temp_output.name, "handwritten_ocr"
+            ocr.save_to_pdf(text, temp_output)
+            return temp_output, "handwritten_ocr"
         else:
-            if not is_pdf_file(file):
-                convert_to_pdf(temp_input.name, temp_output.name)
-                return temp_output.name, "converted_to_pdf"
-            else:
-                import shutil
-                shutil.copy2(temp_input.name, temp_output.name)
-                return temp_output.name, "pdf_original"
+            convert_to_pdf(temp_input, temp_output)
+            return temp_output, "converted_to_pdf"
 
     except Exception as e:
         try:
-            os.unlink(temp_input.name)
-            os.unlink(temp_output.name)
+            if temp_output:
+                os.unlink(temp_output)
         except:
             pass
         raise e
+    finally:
+        # The scratch input is not needed once the PDF is written
+        if temp_input and os.path.exists(temp_input):
+            os.unlink(temp_input)
 
 def classify_and_summarize_document(pdf_path_or_url, title, is_existing=False):
     """Helper function to classify a document, extract text, and generate summary"""
@@ -91,29 +93,36 @@ def classify_and_summarize_document(pdf_path_or_url, title, is_existing=False):
     try:
         # Handle both file paths and URLs
         if is_existing and pdf_path_or_url.startswith('http'):
-            # Download existing document from URL
-            response = requests.get(pdf_path_or_url)
-            response.raise_for_status()
-            
-            # Save to a temporary file for processing
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(response.content)
-                temp_pdf_path = tmp.name
+            # Download existing document from URL, streamed to a temporary file for processing
+            # so the PDF is never held in memory as a whole
+            with _HTTP.get(pdf_path_or_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                response.raise_for_status()
+                # raw is the undecoded body; let urllib3 undo any gzip transfer encoding
+                response.raw.decode_content = True
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+                    temp_pdf_path = tmp.name
+                    shutil.copyfileobj(response.raw, tmp, 1 << 20)
             actual_pdf_path = temp_pdf_path
         else:
             # Use the provided file path directly
             actual_pdf_path = pdf_path_or_url
         
-        # Initialize classifier and process
+        # Initialize classifier and extract the text once for both classification and summary
         classifier = DocumentClassifier()
-        metadata, predicted_departments = classifier.process_pdf(actual_pdf_path)
         extracted_text = classifier.extract_text_from_pdf(actual_pdf_path)
+        has_text = bool(extracted_text and len(extracted_text.strip()) > 0)
+
+        # The Gemini summary is a network round trip and the classification is local spaCy work,
+        # so the summary request runs in the background while the document is classified
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            summary_future = executor.submit(summarizer, extracted_text) if has_text else None
+            metadata, predicted_departments = classifier.process_text(extracted_text)
         
         # Generate summary using the extracted text
         doc_type = "existing document" if is_existing else "document"
-        if extracted_text and len(extracted_text.strip()) > 0:
+        if has_text:
             try:
-                summary = summarizer(extracted_text)
+                summary = summary_future.result()
                 if summary and len(summary.strip()) > 0:
                     print(f"Summary generated for {doc_type} {title}")
                 else:
@@ -168,31 +177,42 @@ def classify_and_summarize_document(pdf_path_or_url, title, is_existing=False):
     
     return classification_results, extracted_text, summary
 
+# Map classifier department names to actual database department names
+DEPARTMENT_MAPPING = {
+    "Finance": "Finance",
+    "Engineering": "Engineering", 
+    "HR": "Human Resources",
+    "Procurement": "Procurement",
+    "Legal": "Legal",
+    "Regulatory": "Regulatory",
+    "Safety": "Safety",
+    "Operations": "Operations"
+}
+
+# Department name -> id, loaded from the departments table on first use and reloaded when a
+# name is missing, so a department added later is picked up without a restart
+_department_ids = None
+_department_ids_lock = threading.Lock()
+
+def _load_department_ids():
+    global _department_ids
+    result = supabase.table("departments").select("id, name").execute()
+    _department_ids = {row["name"]: row["id"] for row in result.data or []}
+    return _department_ids
+
 def get_department_id_by_name(department_name):
     """Get department ID by department name with proper mapping"""
     try:
-        # Map classifier department names to actual database department names
-        department_mapping = {
-            "Finance": "Finance",
-            "Engineering": "Engineering", 
-            "HR": "Human Resources",
-            "Procurement": "Procurement",
-            "Legal": "Legal",
-            "Regulatory": "Regulatory",
-            "Safety": "Safety",
-            "Operations": "Operations"
-        }
-        
         # Get the actual department name from mapping
-        actual_dept_name = department_mapping.get(department_name, department_name)
+        actual_dept_name = DEPARTMENT_MAPPING.get(department_name, department_name)
         
-        result = supabase.table("departments") \
-            .select("id, name") \
-            .eq("name", actual_dept_name) \
-            .execute()
+        department_ids = _department_ids
+        if department_ids is None or actual_dept_name not in department_ids:
+            with _department_ids_lock:
+                department_ids = _load_department_ids()
         
-        if result.data and len(result.data) > 0:
-            dept_id = result.data[0]["id"]
+        dept_id = department_ids.get(actual_dept_name)
+        if dept_id is not None:
             print(f"✓ Mapped '{department_name}' -> '{actual_dept_name}' -> {dept_id}")
             return dept_id
         else:
@@ -202,28 +222,205 @@ def get_department_id_by_name(department_name):
         print(f"Error getting department ID for {department_name}: {str(e)}")
         return None
 
-def link_document_to_departments(document_id, user_id):
+def save_document_summary(doc_id, classification_results, summary):
+    """
+    Store a document's summary, tagged with its primary predicted department
+
+    Returns True if the document_summaries row was stored, False if not (the reason is logged).
+    """
+    summary_data = None
+    # Store summary in document_summaries table
     try:
-        # find departments for this user
-        user_depts = supabase.table("user_departments") \
-            .select("department_id") \
-            .eq("user_id", user_id) \
-            .execute()
+        # Get the first predicted department as the primary department
+        primary_department_id = None
+        if classification_results.get("predicted_departments") and len(classification_results["predicted_departments"]) > 0:
+            # Handle both tuple and string formats
+            if isinstance(classification_results["predicted_departments"][0], tuple):
+                primary_department_name = classification_results["predicted_departments"][0][0]  # Get department name from tuple
+            else:
+                primary_department_name = classification_results["predicted_departments"][0]  # Get department name directly
+            primary_department_id = get_department_id_by_name(primary_department_name)
 
-        if not user_depts.data:
-            return {"warning": "User not mapped to any department"}, 200
+            if not primary_department_id:
 
-        # create mappings in document_departments
-        dept_links = [
-            {"document_id": document_id, "department_id": d["department_id"]}
-            for d in user_depts.data
-        ]
+                print(f"Department '{primary_department_name}' not found in database, saving without department_id")
 
-        supabase.table("document_departments").insert(dept_links).execute()
-        return None
+
+        # Insert summary into document_summaries table (only if summary is not None)
+        if summary and summary.strip():
+            summary_data = {
+                "document_id": doc_id,
+                "summary_text": summary,
+                "department_id": primary_department_id
+            }
+
+            # Insert into database
+            summary_result = supabase.table("document_summaries").insert(summary_data).execute()
+        else:
+            print(f"No valid summary available for document {doc_id}, skipping summary save")
+            summary_result = None
+
+        if summary_result and summary_result.data:
+            print(f"Summary saved to document_summaries table for document {doc_id}")
+            print(f"  - Summary ID: {summary_result.data[0]['id']}")
+            print(f"  - Department ID: {primary_department_id}")
+            print(f"  - Summary length: {len(summary)} characters")
+            return True
+        elif summary_result:
+            print(f"⚠ Failed to save summary to database: {summary_result}")
+        # If summary_result is None, it means no summary was available, which is already logged above
+        return False
+
+    except Exception as db_error:
+        print(f"Failed to save summary to database: {str(db_error)}")
+        # Log the summary data for debugging
+        print(f"Summary data that failed to save: {summary_data}")
+        return False
+
+def record_processing_failure(doc_id, reason):
+    """Store a "Processing failed: <reason>" summary, so /status stops reporting the document as processing"""
+    error_summary = f"Processing failed: {reason}"
+    return save_document_summary(doc_id, {"predicted_departments": None, "summary": error_summary}, error_summary)
+
+def summary_or_message(summary_future, title):
+    """The summary from summary_future, or a message saying why there is none"""
+    if summary_future is None:
+        print(f"No text content available for summarization for document {title}")
+        return "No text content available for summarization"
+    try:
+        summary = summary_future.result()
+    except Exception as summary_error:
+        print(f"Summary generation failed for document {title}: {str(summary_error)}")
+        return f"Summary generation failed: {str(summary_error)}"
+    if summary and len(summary.strip()) > 0:
+        print(f"Summary generated for document {title}")
+        return summary
+    print(f"Summary generation returned empty result for document {title}")
+    return "Summary generation returned empty result"
+
+# Summaries stored with these prefixes record a failure and are not reused for duplicates
+FAILED_SUMMARY_PREFIXES = ("Summary generation failed", "Summary generation returned empty result", "Processing failed")
+
+def reuse_existing_summary(doc_id, content_hashes):
+    """
+    Copy the summary of an earlier upload with one of content_hashes to doc_id
+
+    content_hashes holds the upload's BLAKE3 and SHA-256 digests: rows stored before the
+    switch to BLAKE3 carry the SHA-256 one.
+
+    Returns True if one was found and stored, False if the document has to be processed.
+    """
+    try:
+        res = supabase.table("document_summaries") \
+            .select("summary_text, department_id, documents!inner(content_hash)") \
+            .in_("documents.content_hash", content_hashes) \
+            .limit(5) \
+            .execute()
+        existing = next((row for row in res.data or [] if not row["summary_text"].startswith(FAILED_SUMMARY_PREFIXES)), None)
+        if existing is None:
+            return False
+
+        supabase.table("document_summaries").insert({
+            "document_id": doc_id,
+            "summary_text": existing["summary_text"],
+            "department_id": existing["department_id"]
+        }).execute()
+        print(f"Reused the summary of an earlier upload with the same content for document {doc_id}")
+        return True
     except Exception as e:
-        return {"error": f"Failed linking document to departments: {str(e)}"}, 500
+        print(f"Summary reuse failed for document {doc_id}: {str(e)}")
+        return False
+
+def process_documents(batch):
+    """
+    Classify and summarize uploaded documents, then store their summaries; runs on DOCUMENT_BATCH's threads
+
+    batch is a list of (doc_id, pdf_path, title, duplicate_of) collected by DOCUMENT_BATCH from
+    uploads that arrived together. duplicate_of holds the content hashes of an earlier upload with
+    the same content (None for new content); those documents get its summary copied instead
+    of being classified and summarized again. The remaining texts go through the classifier's
+    spaCy pipeline in one classify_batch() call while the Gemini summaries are requested concurrently.
+
+    Every document of the batch gets a "Processing failed: ..." row when the batch fails or its
+    summary could not be stored, so /document/<id>/status does not report "processing" forever;
+    only if that row cannot be stored either (database unreachable) is the failure just logged.
+    The processed files are deleted in every case.
+
+    The queue is in-process and not durable: see abandon_documents for what happens to
+    uploads still queued when the worker exits.
+    """
+    # doc_ids that already have their summary row
+    done = set()
+    failure = "summary could not be saved"
+    try:
+        jobs = []
+        for doc_id, pdf_path, title, duplicate_of in batch:
+            if duplicate_of and reuse_existing_summary(doc_id, duplicate_of):
+                done.add(doc_id)
+            else:
+                jobs.append((doc_id, pdf_path, title))
+        if not jobs:
+            return
 
+        classifier = DocumentClassifier()
+        texts = []
+        for doc_id, pdf_path, title in jobs:
+            try:
+                texts.append(classifier.extract_text_from_pdf(pdf_path) or "")
+            except Exception as e:
+                print(f"Text extraction failed for document {title}: {str(e)}")
+                texts.append("")
+
+        # The summaries are network round trips and the classification is local spaCy work,
+        # so the summary requests run in the background while the batch is classified
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            summary_futures = [executor.submit(summarizer, text) if text.strip() else None for text in texts]
+            try:
+                classifications = classifier.classify_batch(texts)
+            except Exception as e:
+                print(f"Document classification failed for batch of {len(jobs)}: {str(e)}")
+                classifications = [(None, None)] * len(jobs)
+
+        for (doc_id, pdf_path, title), text, summary_future, (metadata, predicted_departments) in zip(jobs, texts, summary_futures, classifications):
+            summary = summary_or_message(summary_future, title)
+            print(f"Document classification completed for document {title}")
+            print(f"Predicted departments: {predicted_departments}")
+            classification_results = {
+                "metadata": metadata,
+                "predicted_departments": predicted_departments,
+                "extracted_text_length": len(text),
+                "summary": summary
+            }
+            if save_document_summary(doc_id, classification_results, summary):
+                done.add(doc_id)
+    except Exception as e:
+        print(f"Document processing failed for batch of {len(batch)}: {str(e)}")
+        failure = str(e)
+    finally:
+        for doc_id, pdf_path, *_ in batch:
+            if doc_id not in done:
+                record_processing_failure(doc_id, failure)
+            # The processed files are only kept until the summaries are done
+            if os.path.exists(pdf_path):
+                os.unlink(pdf_path)
+
+def abandon_documents(batch):
+    """
+    Record uploads that were still queued when the worker exited; DOCUMENT_BATCH calls this at exit
+
+    Jobs only live in the worker's memory, so a gunicorn restart or reload would
+    otherwise leave them "processing" forever and their processed files on disk. A worker that
+    is killed outright (SIGKILL, the gunicorn timeout) runs no exit handlers: its queued uploads
+    stay "processing" and have to be uploaded again.
+    """
+    for doc_id, pdf_path, title, _ in batch:
+        print(f"Worker exiting before document {title} was processed")
+        record_processing_failure(doc_id, "the server stopped before the document was processed, upload it again")
+        if os.path.exists(pdf_path):
+            os.unlink(pdf_path)
+
+# Uploads that arrive close together are processed as one batch
+DOCUMENT_BATCH = BatchQueue(process_documents, abandon=abandon_documents)
 
 @docs_bp.route("/upload", methods=["POST"])
 def upload_document():
@@ -243,175 +440,107 @@ def upload_document():
     is_handwritten = False
  
     try:
-        processed_file_path, processing_type = process_uploaded_file(file, is_handwritten)
+        # Conversion/OCR runs on the shared document pool, so concurrent uploads queue for it
+        processed_file_path, processing_type = run_document_job(process_uploaded_file, file, is_handwritten)
     except Exception as e:
         return jsonify({"error": f"File processing failed: {str(e)}"}), 500
 
-    # Calculate content hash for reference (but don't check for duplicates)
-    with open(processed_file_path, 'rb') as f:
-        content_hash = calculate_file_hash(f)
-    
     doc_uuid = str(uuid.uuid4())
     safe_title = sanitize_filename(title)[:50]  
     storage_name = f"{doc_uuid}_{safe_title}.pdf"
 
     try:
+        # The open file is hashed in blocks and then handed to the storage client, which
+        # streams it into the request body: the PDF is never held in memory as a whole
         with open(processed_file_path, 'rb') as f:
+            # BLAKE3 content hash plus the SHA-256 one of rows stored before the switch, in one read
+            content_hash, legacy_hash = calculate_file_hashes(f)
             supabase.storage.from_("documents_bucket").upload(
-                storage_name, f.read(),
+                storage_name, f,
                 {"content-type": "application/pdf"}
             )
     except Exception as e:
         os.unlink(processed_file_path)
         return jsonify({"error": f"Storage upload failed: {str(e)}"}), 500
     
-    # Process document with DocumentClassifier and generate summary using the already processed file
-    classification_results, extracted_text, summary = classify_and_summarize_document(processed_file_path, title, is_existing=False)
-
-    # Now clean up the temp file and get public URL
-    os.unlink(processed_file_path)
     # get public url
     file_url = supabase.storage.from_("documents_bucket").get_public_url(storage_name)
 
-    # insert into DB
+    # insert into DB and link the document to the uploader's departments in one call
+    # (sql/publish_document.sql); a duplicate content_hash is suffixed inside insert_document,
+    # which also treats a row stored with the SHA-256 digest from before BLAKE3 as a duplicate
     try:
         print(f"Inserting document into database: {title}")
-        res = supabase.table("documents").insert({
-            "title": title,
-            "file_url": file_url,
-            "language": language,
-            "type": doc_type,
-            "source": source,
-            "uploaded_by": uploaded_by,
-            "content_hash": content_hash
+        res = supabase.rpc("publish_document", {
+            "p_title": title,
+            "p_file_url": file_url,
+            "p_language": language,
+            "p_type": doc_type,
+            "p_source": source,
+            "p_uploaded_by": uploaded_by,
+            "p_content_hash": content_hash,
+            "p_legacy_hash": legacy_hash
         }).execute()
 
         if not res.data:
 
             print(f"Database insert failed: {res}")
+            os.unlink(processed_file_path)
             return jsonify({"error": f"Database insert failed: {res}"}), 500
 
         doc_id = res.data[0]["id"]
+        departments_linked = res.data[0]["departments_linked"]
+        # insert_document only changes the hash when the same content was stored before
+        duplicate_of = [content_hash, legacy_hash] if res.data[0]["content_hash"] != content_hash else None
+        if duplicate_of:
+            print(f"Duplicate content detected, stored with content hash {res.data[0]['content_hash']}")
         print(f"Document inserted with ID: {doc_id}")
         
     except Exception as db_insert_error:
-        # Check if it's a duplicate content_hash error
-        if "duplicate key value violates unique constraint" in str(db_insert_error) and "content_hash" in str(db_insert_error):
-
-            print(f"Duplicate content detected, generating new content hash for duplicate upload")
-
-            # Generate a new content hash with timestamp to make it unique
-            import time
-            unique_content_hash = f"{content_hash}_{int(time.time())}"
-            
-            try:
-                res = supabase.table("documents").insert({
-                    "title": title,
-                    "file_url": file_url,
-                    "language": language,
-                    "type": doc_type,
-                    "source": source,
-                    "uploaded_by": uploaded_by,
-                    "content_hash": unique_content_hash
-                }).execute()
-
-                if not res.data:
-
-                    print(f"Retry database insert failed: {res}")
-                    return jsonify({"error": f"Retry database insert failed: {res}"}), 500
-
-                doc_id = res.data[0]["id"]
-                print(f"Document inserted with unique hash ID: {doc_id}")
-            except Exception as retry_error:
-                print(f"Retry database insert failed: {str(retry_error)}")
-                return jsonify({"error": f"Database insert failed after retry: {str(retry_error)}"}), 500
-        else:
-            print(f"Database insert failed: {str(db_insert_error)}")
-            return jsonify({"error": f"Database insert failed: {str(db_insert_error)}"}), 500
-
-    # Store summary in document_summaries table
-    try:
-        # Get the first predicted department as the primary department
-        primary_department_id = None
-        if classification_results.get("predicted_departments") and len(classification_results["predicted_departments"]) > 0:
-            # Handle both tuple and string formats
-            if isinstance(classification_results["predicted_departments"][0], tuple):
-                primary_department_name = classification_results["predicted_departments"][0][0]  # Get department name from tuple
-            else:
-                primary_department_name = classification_results["predicted_departments"][0]  # Get department name directly
-            primary_department_id = get_department_id_by_name(primary_department_name)
-            
-            if not primary_department_id:
-
-                print(f"Department '{primary_department_name}' not found in database, saving without department_id")
-
-        
-        # Insert summary into document_summaries table (only if summary is not None)
-        if summary and summary.strip():
-            summary_data = {
-                "document_id": doc_id,
-                "summary_text": summary,
-                "department_id": primary_department_id
-            }
-            
-            # Insert into database
-            summary_result = supabase.table("document_summaries").insert(summary_data).execute()
-        else:
-            print(f"No valid summary available for document {doc_id}, skipping summary save")
-            summary_result = None
-        
-        if summary_result and summary_result.data:
-            print(f"Summary saved to document_summaries table for document {doc_id}")
-            print(f"  - Summary ID: {summary_result.data[0]['id']}")
-            print(f"  - Department ID: {primary_department_id}")
-            print(f"  - Summary length: {len(summary)} characters")
-        elif summary_result:
-            print(f"⚠ Failed to save summary to database: {summary_result}")
-        # If summary_result is None, it means no summary was available, which is already logged above
-        
-    except Exception as db_error:
-        print(f"Failed to save summary to database: {str(db_error)}")
-        # Log the summary data for debugging
-        print(f"Summary data that failed to save: {summary_data}")
-
-    # Link document to departments
-    try:
-        print(f"Linking document {doc_id} to departments for user {uploaded_by}")
-        link_err = link_document_to_departments(doc_id, uploaded_by)
-        if link_err:
-            print(f"⚠ Department linking failed: {link_err}")
-            return jsonify(link_err[0]), link_err[1]
-        print(f"Document linked to departments successfully")
-    except Exception as link_error:
-        print(f"Error linking document to departments: {str(link_error)}")
-        # Continue even if linking fails
-
+        print(f"Database insert failed: {str(db_insert_error)}")
+        os.unlink(processed_file_path)
+        return jsonify({"error": f"Database insert failed: {str(db_insert_error)}"}), 500
+
+    # Classification and the Gemini summary take seconds to minutes; they run in the background,
+    # batched with other recent uploads, and the client polls /document/<id>/status for the summary
+    DOCUMENT_BATCH.submit((doc_id, processed_file_path, title, duplicate_of))
+
+    response = {
+        "message": "Document uploaded, processing started",
+        "status": "processing",
+        "document_id": doc_id,
+        "file_url": file_url,
+        "processing_type": processing_type
+    }
+
+    # Department links were created together with the document; the document is processed
+    # either way, so the client still gets its id to poll
+    if not departments_linked:
+        print(f"⚠ Department linking failed: User not mapped to any department")
+        response["warning"] = "User not mapped to any department"
+    else:
+        print(f"Document {doc_id} linked to {departments_linked} departments")
+
+    return jsonify(response), 202
+
+@docs_bp.route("/<doc_id>/status", methods=["GET"])
+def document_status(doc_id):
+    """Report whether an uploaded document's summary is ready"""
     try:
-        # Ensure all response data is JSON serializable
-        safe_classification_results = classification_results if classification_results else {}
-        safe_extracted_text_preview = extracted_text[:500] if extracted_text else None
-        safe_summary = summary if summary else "No summary available"
-        
-        response_data = {
-            "message": "Document uploaded and processed successfully",
-            "document_id": doc_id,
-            "file_url": file_url,
-             "processing_type": processing_type,
-            "classification_results": safe_classification_results,
-            "extracted_text_preview": safe_extracted_text_preview,
-            "summary": safe_summary
-        }
-
-        print(f"Preparing response for document {doc_id}")
-
-        print(f"  - Classification results type: {type(safe_classification_results)}")
-        print(f"  - Summary length: {len(safe_summary)}")
-        return jsonify(response_data), 201
-    
-    except Exception as response_error:
-
-        print(f"Error preparing response: {str(response_error)}")
-        return jsonify({"error": f"Response preparation failed: {str(response_error)}"}), 500
-    
+        res = supabase.table("document_summaries") \
+            .select("summary_text, department_id") \
+            .eq("document_id", doc_id) \
+            .limit(1) \
+            .execute()
+    except Exception as e:
+        return jsonify({"error": f"Status lookup failed: {str(e)}"}), 500
 
+    if not res.data:
+        return jsonify({"document_id": doc_id, "status": "processing"}), 200
 
+    return jsonify({
+        "document_id": doc_id,
+        "status": "completed",
+        "summary": res.data[0]["summary_text"],
+        "department_id": res.data[0]["department_id"]
+    }), 200
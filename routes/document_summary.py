@@ -29,24 +29,22 @@ def get_summaries():
             return jsonify({"summaries": []}), 200
         department_ids = [row["department_id"] for row in dept_res.data]
 
-        summaries = []
-        for dept_id in department_ids:
-            
-            sum_res = supabase.table("document_summaries") \
-                .select("id, summary_text, document_id, documents(title, file_url)") \
-                .eq("department_id", dept_id) \
-                .execute()
+        # One query for all of the user's departments instead of one per department
+        sum_res = supabase.table("document_summaries") \
+            .select("id, summary_text, document_id, department_id, documents(title, file_url)") \
+            .in_("department_id", department_ids) \
+            .execute()
 
-            if sum_res.data:
-                for row in sum_res.data:
-                    doc_info = row.get("documents") or {}
-                    summaries.append({
-                        "document_id": row["document_id"],
-                        "title": doc_info.get("title"),
-                        "file_url": doc_info.get("file_url"),
-                        "summary_text": row["summary_text"],
-                        "department_id": dept_id
-                    })
+        summaries = []
+        for row in sum_res.data or []:
+            doc_info = row.get("documents") or {}
+            summaries.append({
+                "document_id": row["document_id"],
+                "title": doc_info.get("title"),
+                "file_url": doc_info.get("file_url"),
+                "summary_text": row["summary_text"],
+                "department_id": row["department_id"]
+            })
 
         # Remove duplicates keeping longest summary per document
         unique_summaries = {}
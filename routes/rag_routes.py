@@ -1,10 +1,32 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from utils.auth_middleware import jwt_optional
-from Model_rag.query import ask_question, summarizer
+from Model_rag.query import ask_question, stream_answer, summarizer
 import uuid
 
 rag_bp = Blueprint("rag", __name__)
 
+
+def _validate_question(data):
+    """Returns (question, None) for a valid request body, or (None, error response) otherwise."""
+    if not data:
+        return None, (jsonify({"error": "Request body is required"}), 400)
+    
+    question = data.get("question")
+    if not question or not question.strip():
+        return None, (jsonify({"error": "Question is required and cannot be empty"}), 400)
+    
+    # Clean and validate the question
+    question = question.strip()
+    if len(question) < 3:
+        return None, (jsonify({"error": "Question must be at least 3 characters long"}), 400)
+    
+    if len(question) > 1000:
+        return None, (jsonify({"error": "Question must be less than 1000 characters"}), 400)
+    
+    return question, None
+
+
 @rag_bp.route("/ask", methods=["POST"])
 @jwt_optional
 def ask_rag_question():
@@ -13,22 +35,9 @@ def ask_rag_question():
     Authentication is optional.
     """
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({"error": "Request body is required"}), 400
-        
-        question = data.get("question")
-        if not question or not question.strip():
-            return jsonify({"error": "Question is required and cannot be empty"}), 400
-        
-        # Clean and validate the question
-        question = question.strip()
-        if len(question) < 3:
-            return jsonify({"error": "Question must be at least 3 characters long"}), 400
-        
-        if len(question) > 1000:
-            return jsonify({"error": "Question must be less than 1000 characters"}), 400
+        question, error = _validate_question(request.get_json())
+        if error:
+            return error
         
         # Get the answer from RAG system
         answer = ask_question(question)
@@ -53,3 +62,31 @@ def ask_rag_question():
         return jsonify({"error": f"Failed to process question: {str(e)}"}), 500
 
 
+@rag_bp.route("/ask/stream", methods=["POST"])
+@jwt_optional
+def ask_rag_question_stream():
+    """
+    Ask a question using the RAG system and receive the answer as Server-Sent Events.
+    Each event carries {"delta": "..."} with the next piece of the answer;
+    the stream ends with {"done": true} or {"error": "..."}.
+    Authentication is optional.
+    """
+    question, error = _validate_question(request.get_json(silent=True))
+    if error:
+        return error
+
+    def events():
+        try:
+            for text in stream_answer(question):
+                yield f"data: {json.dumps({'delta': text})}\n\n"
+            yield f"data: {json.dumps({'done': True})}\n\n"
+        except Exception as e:
+            print(f"Error in ask_rag_question_stream: {str(e)}")
+            yield f"data: {json.dumps({'error': f'Failed to process question: {str(e)}'})}\n\n"
+
+    # No proxy buffering, so each event reaches the client as soon as it is generated
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,32 +1,15 @@
 import os
 import tempfile
 import uuid
-import hashlib
-import re
 from flask import Blueprint, request, jsonify
 from utils.supabase import supabase
+from utils.files import calculate_file_hash, sanitize_filename, is_pdf_file
+from utils.background import run_document_job
 from functions import PDFTranslator
 from deep_translator import GoogleTranslator
 
 translate_bp = Blueprint("translate", __name__)
 
-def calculate_file_hash(file):
-    sha256 = hashlib.sha256()
-    for chunk in iter(lambda: file.read(4096), b""):
-        sha256.update(chunk)
-    file.seek(0)
-    return sha256.hexdigest()
-
-def sanitize_filename(filename):
-    # Keep only safe chars for storage 
-    return re.sub(r'[^a-zA-Z0-9_\-\.]', '_', filename)
-
-def is_pdf_file(file):
-    """Check if the file is already a PDF"""
-    import mimetypes
-    mime_type, _ = mimetypes.guess_type(file.filename)
-    return mime_type == 'application/pdf'
-
 @translate_bp.route("/translate-document", methods=["POST"])
 def translate_document():
     """Translate a PDF document using PDFTranslator"""
@@ -58,9 +41,9 @@ def translate_document():
         file.save(temp_input.name)
         file.seek(0)  # Reset file pointer
         
-        # Translate the document
+        # Translate the document on the shared document pool
         translator = PDFTranslator()
-        translated_text = translator.translate_pdf(temp_input.name, temp_output.name, direction)
+        translated_text = run_document_job(translator.translate_pdf, temp_input.name, temp_output.name, direction)
         
         # Generate new filename and upload to storage
         direction_suffix = "en" if direction == "ml2en" else "ml"
@@ -69,19 +52,18 @@ def translate_document():
         safe_title = sanitize_filename(translated_title)[:50]
         storage_name = f"{doc_uuid}_{safe_title}.pdf"
         
-        # Upload translated PDF to storage
+        # Upload translated PDF to storage: the open file is hashed in blocks, then streamed
+        # into the request body instead of being read into memory first
         with open(temp_output.name, 'rb') as f:
+            # Calculate content hash
+            content_hash = calculate_file_hash(f)
             supabase.storage.from_("documents_bucket").upload(
-                storage_name, f.read(),
+                storage_name, f,
                 {"content-type": "application/pdf"}
             )
         
         translated_file_url = supabase.storage.from_("documents_bucket").get_public_url(storage_name)
         
-        # Calculate content hash
-        with open(temp_output.name, 'rb') as f:
-            content_hash = calculate_file_hash(f)
-        
         # Insert translated document into database
         res = supabase.table("documents").insert({
             "title": translated_title,
@@ -0,0 +1,45 @@
+-- Inserts a documents row in one round trip from /documents/upload.
+-- content_hash is unique; a duplicate upload is stored as a new row whose hash gets a
+-- "_<unix time>" suffix, as the route used to do with a second INSERT after the first failed.
+-- p_legacy_hash is the upload's SHA-256 digest: rows stored before content_hash switched to
+-- BLAKE3 hold one, and an upload matching such a row is a duplicate as well.
+-- Replaces the version without p_legacy_hash; apply publish_document.sql again afterwards.
+DROP FUNCTION IF EXISTS insert_document(
+    documents.title%TYPE, documents.file_url%TYPE, documents.language%TYPE, documents.type%TYPE,
+    documents.source%TYPE, documents.uploaded_by%TYPE, documents.content_hash%TYPE
+);
+
+CREATE OR REPLACE FUNCTION insert_document(
+    p_title documents.title%TYPE,
+    p_file_url documents.file_url%TYPE,
+    p_language documents.language%TYPE,
+    p_type documents.type%TYPE,
+    p_source documents.source%TYPE,
+    p_uploaded_by documents.uploaded_by%TYPE,
+    p_content_hash documents.content_hash%TYPE,
+    p_legacy_hash documents.content_hash%TYPE DEFAULT NULL
+)
+RETURNS SETOF documents
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_legacy_hash IS NULL
+       OR NOT EXISTS (SELECT 1 FROM documents d WHERE d.content_hash = p_legacy_hash) THEN
+        RETURN QUERY
+        INSERT INTO documents (title, file_url, language, type, source, uploaded_by, content_hash)
+        VALUES (p_title, p_file_url, p_language, p_type, p_source, p_uploaded_by, p_content_hash)
+        ON CONFLICT (content_hash) DO NOTHING
+        RETURNING *;
+
+        IF FOUND THEN
+            RETURN;
+        END IF;
+    END IF;
+
+    RETURN QUERY
+    INSERT INTO documents (title, file_url, language, type, source, uploaded_by, content_hash)
+    VALUES (p_title, p_file_url, p_language, p_type, p_source, p_uploaded_by,
+            p_content_hash || '_' || floor(extract(epoch FROM now()))::bigint)
+    RETURNING *;
+END;
+$$;
@@ -0,0 +1,19 @@
+-- Links a document to every department of the uploading user in one round trip
+-- (used by link_document_to_departments in routes/document_routes.py).
+-- Returns the number of document_departments rows created; 0 means the user has no departments.
+CREATE OR REPLACE FUNCTION link_document_to_departments(
+    p_document_id document_departments.document_id%TYPE,
+    p_user_id user_departments.user_id%TYPE
+)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH linked AS (
+        INSERT INTO document_departments (document_id, department_id)
+        SELECT p_document_id, department_id
+        FROM user_departments
+        WHERE user_id = p_user_id
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM linked;
+$$;
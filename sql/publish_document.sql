@@ -0,0 +1,35 @@
+-- Stores an uploaded document and links it to the uploader's departments in one round trip
+-- from /documents/upload, in one transaction. Needs insert_document.sql and
+-- link_document_to_departments.sql applied first.
+-- departments_linked is 0 when the uploader is not mapped to any department.
+-- p_legacy_hash is passed on to insert_document (the upload's SHA-256 digest).
+DROP FUNCTION IF EXISTS publish_document(
+    documents.title%TYPE, documents.file_url%TYPE, documents.language%TYPE, documents.type%TYPE,
+    documents.source%TYPE, documents.uploaded_by%TYPE, documents.content_hash%TYPE
+);
+
+CREATE OR REPLACE FUNCTION publish_document(
+    p_title documents.title%TYPE,
+    p_file_url documents.file_url%TYPE,
+    p_language documents.language%TYPE,
+    p_type documents.type%TYPE,
+    p_source documents.source%TYPE,
+    p_uploaded_by documents.uploaded_by%TYPE,
+    p_content_hash documents.content_hash%TYPE,
+    p_legacy_hash documents.content_hash%TYPE DEFAULT NULL
+)
+RETURNS TABLE (id documents.id%TYPE, content_hash documents.content_hash%TYPE, departments_linked integer)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    doc documents;
+BEGIN
+    SELECT * INTO doc
+    FROM insert_document(p_title, p_file_url, p_language, p_type, p_source, p_uploaded_by, p_content_hash, p_legacy_hash);
+
+    id := doc.id;
+    content_hash := doc.content_hash;
+    departments_linked := link_document_to_departments(doc.id, p_uploaded_by);
+    RETURN NEXT;
+END;
+$$;
@@ -0,0 +1,9 @@
+-- Unique index for the email lookups in /auth/login and /auth/signup, so they are
+-- index scans instead of sequential scans over users.
+-- The routes store and query emails lowercased; lowercase the existing rows first.
+-- Creating the index fails if two accounts differ only in email case: merge those first.
+UPDATE users SET email = lower(email) WHERE email <> lower(email);
+
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_idx ON users (email);
+
+ANALYZE users;
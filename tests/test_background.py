@@ -0,0 +1,107 @@
+"""
+Tests for the background batch queue used by document uploads.
+"""
+import time
+import threading
+from utils.background import BatchQueue
+
+
+def wait_until(condition, timeout=5.0):
+    """Poll condition until it holds or timeout seconds have passed."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class TestBatching:
+    """Test how submitted items are grouped into batches."""
+
+    def test_batches_are_capped_at_max_batch_size(self):
+        """Items submitted together are split into batches of at most max_batch_size."""
+        batches = []
+        queue = BatchQueue(batches.append, max_batch_size=3, max_wait_ms=200)
+
+        for item in range(7):
+            queue.submit(item)
+
+        assert wait_until(lambda: sum(len(batch) for batch in batches) == 7)
+        assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+    def test_items_after_the_wait_window_start_a_new_batch(self):
+        """An item arriving after max_wait_ms is not added to the previous batch."""
+        batches = []
+        queue = BatchQueue(batches.append, max_batch_size=8, max_wait_ms=50)
+
+        queue.submit("first")
+        assert wait_until(lambda: len(batches) == 1)
+        queue.submit("second")
+        assert wait_until(lambda: len(batches) == 2)
+
+        assert batches == [["first"], ["second"]]
+
+    def test_handler_exception_is_logged_and_queue_keeps_running(self, capsys):
+        """A batch whose handler raises is logged with its traceback; later batches still run."""
+        batches = []
+
+        def handler(batch):
+            if "bad" in batch:
+                raise RuntimeError("handler exploded")
+            batches.append(batch)
+
+        queue = BatchQueue(handler, max_batch_size=1, max_wait_ms=10)
+        queue.submit("bad")
+        queue.submit("good")
+
+        assert wait_until(lambda: batches == [["good"]])
+        captured = capsys.readouterr()
+        assert "Batch of 1 failed in handler" in captured.out
+        assert "RuntimeError: handler exploded" in captured.err
+
+
+class TestPendingItems:
+    """Test the bookkeeping of items that have not reached the handler yet."""
+
+    def test_handled_items_are_not_pending(self):
+        """Items handed to the handler are no longer passed to abandon."""
+        abandoned = []
+        done = threading.Event()
+        queue = BatchQueue(lambda batch: done.set(), max_wait_ms=10, abandon=abandoned.extend)
+
+        queue.submit("item")
+        assert done.wait(5)
+        queue._abandon_pending()
+
+        assert abandoned == []
+
+    def test_items_in_the_wait_window_are_abandoned_at_exit(self):
+        """Items still being collected into a batch are passed to abandon by the exit handler."""
+        abandoned = []
+        queue = BatchQueue(lambda batch: None, max_batch_size=8, max_wait_ms=60_000, abandon=abandoned.extend)
+
+        queue.submit("first")
+        queue.submit("second")
+        queue._abandon_pending()
+
+        assert abandoned == ["first", "second"]
+
+    def test_reset_after_fork_starts_a_fresh_collector(self):
+        """The fork hook drops the parent's threads and queue; the child starts its own on submit."""
+        batches = []
+        queue = BatchQueue(batches.append, max_batch_size=1, max_wait_ms=10)
+        queue.submit("parent")
+        assert wait_until(lambda: batches == [["parent"]])
+        parent_worker = queue._worker
+
+        # What os.register_at_fork(after_in_child=...) runs in a forked worker
+        queue._reset()
+        assert queue._worker is None
+        assert queue._executor is None
+        assert queue._pending == {}
+        assert queue._queue.empty()
+
+        queue.submit("child")
+        assert wait_until(lambda: batches == [["parent"], ["child"]])
+        assert queue._worker is not parent_worker
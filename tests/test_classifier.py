@@ -0,0 +1,134 @@
+"""
+Parity tests for DocumentClassifier's phrase scoring.
+
+DEPARTMENT_PHRASE_RULES replaced phrase lists and weights written out inside
+classify_department; these tests pin the table to that original logic.
+"""
+import re
+import pytest
+from collections import defaultdict
+from unittest.mock import patch
+from functions import DocumentClassifier, DEPARTMENT_PHRASE_RULES
+
+TEXTS = {
+    "procurement": "Notice Inviting Tender for rolling stock. Bidders must pay Earnest Money (EMD) "
+                   "and submit the Bill of Quantities.",
+    "finance": "Audited balance sheet and profit and loss statement with the invoice register "
+               "and tax refund claims.",
+    "legal": "Writ petition filed by the petitioner; the respondent relies on the arbitration clause "
+             "and may appeal.",
+    "regulatory": "Environmental clearance and EIA conditions, safety norms and the technical "
+                  "specification for rolling stock.",
+    "engineering": "Engineering report on Maximo work orders with the budget estimate for the depot.",
+}
+
+# Departments and printed scores of the hand-written classify_department for TEXTS
+# (empty metadata), recorded before the table replaced it
+BASELINE = {
+    "procurement": (["Procurement"], {"Procurement": 1.0, "Engineering": 0.23, "Legal": 0.0,
+                                      "Finance": 0.0, "Regulatory": 0.0, "HR": 0.0}),
+    "finance": (["Finance"], {"Finance": 1.0, "Procurement": 0.0, "Legal": 0.0,
+                              "Regulatory": 0.0, "Engineering": 0.0, "HR": 0.0}),
+    "legal": (["Legal"], {"Legal": 1.0, "Procurement": 0.0, "Finance": 0.0,
+                          "Regulatory": 0.0, "Engineering": 0.0, "HR": 0.0}),
+    "regulatory": (["Regulatory", "Engineering"], {"Regulatory": 1.0, "Engineering": 1.0, "Procurement": 0.0,
+                                                   "Finance": 0.0, "Legal": 0.0}),
+    "engineering": (["Engineering"], {"Finance": 0.33, "Engineering": 1.0, "Procurement": 0.0, "Legal": 0.0}),
+}
+
+
+def baseline_phrase_scores(found):
+    """The phrase part of the original classify_department, as it was written out by hand."""
+    raw = defaultdict(float)
+    reasons = defaultdict(list)
+
+    procurement_phrases = [
+        "tender document", "notice inviting tender", "form of tender",
+        "bill of quantities", "tender security", "tenderer", "earnest money",
+        "emd", "bid", "bidder", "purchase order", "contract no",
+        "evaluation of tender", "tender opening", "tender validity"
+    ]
+    proc_kw_hits = sum(1 for kw in procurement_phrases if kw in found)
+    if proc_kw_hits:
+        raw["Procurement"] += proc_kw_hits * 1.2
+        reasons["Procurement"].append(f"procurement_phrase_hits={proc_kw_hits}")
+    if any(k in found for k in ["notice inviting tender", "form of tender", "bill of quantities"]):
+        raw["Procurement"] += 3.0
+        reasons["Procurement"].append("strong_proc_indicator_phrase")
+
+    legal_phrases = ["petitioner", "respondent", "writ petition", "tribunal order", "appeal", "arbitration clause"]
+    legal_phrase_hits = sum(1 for k in legal_phrases if k in found)
+    if legal_phrase_hits:
+        raw["Legal"] += legal_phrase_hits * 0.8
+        reasons["Legal"].append(f"legal_phrase_hits={legal_phrase_hits}")
+
+    rules = [
+        ("Finance", 3.0, "tax_term_found", ["tax reimbursement", "tax return", "tax refund"]),
+        ("Finance", 2.0, "financial_statement_found", ["annual report", "balance sheet", "audited"]),
+        ("Finance", 1.5, "invoice_found", ["invoice"]),
+        ("Finance", 2.0, "p&l_found", ["profit and loss", "p&l account"]),
+        ("Finance", 1.5, "budget_terms_found", ["budget estimate", "expenditure report"]),
+        ("Regulatory", 3.0, "environmental_found", ["eia", "environmental impact", "environmental clearance"]),
+        ("Regulatory", 1.5, "safety_directive_found", ["safety directive", "safety norms"]),
+        ("Regulatory", 2.0, "regulatory_directive_found", ["compliance order", "regulatory directive"]),
+        ("Engineering", 3.0, "rolling_stock_or_maximo", ["rolling stock", "maximo"]),
+        ("Engineering", 1.5, "technical_terms_found", ["technical specification", "engineering report"]),
+    ]
+    for dept, weight, reason, phrases in rules:
+        if any(phrase in found for phrase in phrases):
+            raw[dept] += weight
+            reasons[dept].append(reason)
+    return dict(raw), dict(reasons)
+
+
+def empty_metadata():
+    return {
+        "general": {"PERSON": [], "ORG": [], "DATE": [], "AMOUNT": [], "LOCATION": []},
+        "HR": {"EMPLOYEE_ID": [], "JOB_TITLE": [], "GRADE_PAY": [], "RECRUITMENT_ADV_NO": []},
+        "Procurement": {"TENDER_ID": [], "PURCHASE_ORDER_NO": [], "BIDDER_NAME": [], "CONTRACT_ID": [],
+                        "ITEM_SERVICE": [], "DEADLINE": []},
+        "Legal": {"CASE_NO": [], "COURT_NAME": [], "LAW_SECTION": [], "PARTY_NAME": [], "SOP_CLAUSE": []},
+    }
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    """A classifier with the real keyword automaton; the spaCy pipeline is not needed for phrase scoring."""
+    with patch("functions.get_spacy_nlp"), patch("functions.Matcher"):
+        yield DocumentClassifier()
+
+
+def table_phrase_scores(classifier, found):
+    raw = defaultdict(float)
+    reasons = defaultdict(list)
+    for dept in DEPARTMENT_PHRASE_RULES:
+        classifier._score_phrases(dept, found, raw, reasons)
+    return dict(raw), dict(reasons)
+
+
+class TestPhraseTableParity:
+    """Test that the table scores phrases exactly like the hand-written logic did."""
+
+    def test_keyword_phrases_are_the_baseline_phrases(self):
+        """The automaton looks for the same 43 phrases as before, each once."""
+        assert len(DocumentClassifier.KEYWORD_PHRASES) == len(set(DocumentClassifier.KEYWORD_PHRASES)) == 43
+
+    @pytest.mark.parametrize("name", sorted(TEXTS))
+    def test_representative_texts_score_the_same(self, classifier, name):
+        found = classifier._find_phrases(TEXTS[name].lower())
+
+        assert table_phrase_scores(classifier, found) == baseline_phrase_scores(found)
+
+    @pytest.mark.parametrize("phrase", DocumentClassifier.KEYWORD_PHRASES)
+    def test_each_phrase_alone_scores_the_same(self, classifier, phrase):
+        assert table_phrase_scores(classifier, {phrase}) == baseline_phrase_scores({phrase})
+
+    @pytest.mark.parametrize("name", sorted(TEXTS))
+    def test_classify_department_matches_baseline(self, classifier, capsys, name):
+        """End to end: same predicted departments and printed scores as the original classifier."""
+        departments, scores = BASELINE[name]
+
+        assert classifier.classify_department(empty_metadata(), TEXTS[name]) == departments
+
+        printed = capsys.readouterr().out.split("Reasons:")[0]
+        assert {dept: float(score) for dept, score in re.findall(r"^  (\w+): ([\d.]+)$", printed, re.M)} == scores
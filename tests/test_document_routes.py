@@ -0,0 +1,319 @@
+"""
+Tests for document uploads and their background processing.
+supabase, the classifier and the summarizer are replaced by in-memory stubs.
+"""
+import io
+import os
+import tempfile
+import pytest
+from unittest.mock import patch, MagicMock
+import routes.document_routes as document_routes
+
+PDF_BYTES = b"%PDF-1.4\n1 0 obj\n<<>>\nendobj\ntrailer\n<<>>\n%%EOF\n"
+
+
+class FakeQuery:
+    """The subset of the supabase query builder used by routes/document_routes.py."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.row = None
+        self.max_rows = None
+
+    def select(self, *columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, lambda stored: stored == value))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, lambda stored: stored in values))
+        return self
+
+    def limit(self, count):
+        self.max_rows = count
+        return self
+
+    def insert(self, row):
+        self.row = row
+        return self
+
+    def _value(self, row, column):
+        # "documents.content_hash" filters on the embedded documents row
+        if "." in column:
+            table, field = column.split(".")
+            embedded = next(doc for doc in self.db.tables[table] if doc["id"] == row["document_id"])
+            return embedded[field]
+        return row[column]
+
+    def execute(self):
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.row is not None:
+            if self.db.failing_inserts:
+                self.db.failing_inserts -= 1
+                raise Exception("insert failed")
+            stored = dict(self.row, id=len(rows) + 1)
+            rows.append(stored)
+            return MagicMock(data=[stored])
+        found = [row for row in rows if all(match(self._value(row, column)) for column, match in self.filters)]
+        return MagicMock(data=found[:self.max_rows])
+
+
+class FakeSupabase:
+    """In-memory tables plus the publish_document RPC (sql/publish_document.sql)."""
+
+    def __init__(self, departments_linked=1):
+        self.tables = {"documents": [], "document_summaries": [], "departments": [{"id": 7, "name": "Finance"}]}
+        self.departments_linked = departments_linked
+        self.failing_inserts = 0
+        self.storage = MagicMock()
+        self.storage.from_.return_value.get_public_url.return_value = "https://storage.example/doc.pdf"
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        assert name == "publish_document"
+        documents = self.tables["documents"]
+        content_hash = params["p_content_hash"]
+        known = {doc["content_hash"] for doc in documents}
+        if content_hash in known or params.get("p_legacy_hash") in known:
+            content_hash = f"{content_hash}_1700000000"
+        row = {"id": f"doc-{len(documents) + 1}", "title": params["p_title"], "content_hash": content_hash}
+        documents.append(row)
+        return MagicMock(execute=lambda: MagicMock(data=[
+            {"id": row["id"], "content_hash": content_hash, "departments_linked": self.departments_linked}
+        ]))
+
+    def summaries(self, doc_id):
+        return [row for row in self.tables["document_summaries"] if row["document_id"] == doc_id]
+
+
+@pytest.fixture
+def fake_supabase():
+    fake = FakeSupabase()
+    with patch.object(document_routes, "supabase", fake), \
+         patch.object(document_routes, "_department_ids", None):
+        yield fake
+
+
+@pytest.fixture
+def classifier():
+    """The DocumentClassifier instance process_documents creates."""
+    instance = MagicMock()
+    instance.extract_text_from_pdf.return_value = "Invoice for the annual maintenance contract"
+    instance.classify_batch.side_effect = lambda texts: [({}, ["Finance"]) for _ in texts]
+    with patch.object(document_routes, "DocumentClassifier", return_value=instance):
+        yield instance
+
+
+@pytest.fixture
+def summarizer():
+    with patch.object(document_routes, "summarizer", return_value="A short summary") as stub:
+        yield stub
+
+
+@pytest.fixture
+def document_batch():
+    """Captures submitted jobs instead of running them on the background threads."""
+    with patch.object(document_routes, "DOCUMENT_BATCH") as batch:
+        yield batch
+
+
+def upload(client, title="Invoice"):
+    return client.post("/document/upload", data={
+        "file": (io.BytesIO(PDF_BYTES), "invoice.pdf"),
+        "title": title,
+        "uploaded_by": "test-user-123",
+    }, content_type="multipart/form-data")
+
+
+def make_job(doc_id, title="Invoice", duplicate_of=None):
+    """A (doc_id, pdf_path, title, duplicate_of) item with a real processed file on disk."""
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(PDF_BYTES)
+    return (doc_id, path, title, duplicate_of)
+
+
+class TestUpload:
+    """Test the upload route up to the point where the job is queued."""
+
+    def test_upload_returns_202_and_queues_the_job(self, client, fake_supabase, document_batch):
+        """An upload answers 202 with the id to poll and queues the processed file."""
+        response = upload(client)
+
+        assert response.status_code == 202
+        data = response.get_json()
+        assert data["status"] == "processing"
+        assert data["document_id"] == "doc-1"
+        assert "warning" not in data
+
+        (doc_id, pdf_path, title, duplicate_of), = document_batch.submit.call_args.args
+        assert (doc_id, title, duplicate_of) == ("doc-1", "Invoice", None)
+        assert os.path.exists(pdf_path)
+        os.unlink(pdf_path)
+
+    def test_upload_without_departments_still_returns_the_document_id(self, client, fake_supabase, document_batch):
+        """An uploader without departments gets the same 202 payload plus a warning."""
+        fake_supabase.departments_linked = 0
+
+        response = upload(client)
+
+        assert response.status_code == 202
+        data = response.get_json()
+        assert data["document_id"] == "doc-1"
+        assert data["status"] == "processing"
+        assert data["warning"] == "User not mapped to any department"
+        os.unlink(document_batch.submit.call_args.args[0][1])
+
+    def test_reupload_is_queued_as_a_duplicate(self, client, fake_supabase, document_batch):
+        """The same content uploaded again carries both of its digests as duplicate_of."""
+        upload(client)
+        upload(client, title="Invoice again")
+
+        first, second = [call.args[0] for call in document_batch.submit.call_args_list]
+        assert first[3] is None
+        content_hash, legacy_hash = second[3]
+        assert content_hash == fake_supabase.tables["documents"][0]["content_hash"]
+        assert len(legacy_hash) == 64 and legacy_hash != content_hash
+        for job in (first, second):
+            os.unlink(job[1])
+
+
+class TestStatus:
+    """Test /document/<id>/status across background processing."""
+
+    def test_status_goes_from_processing_to_completed(self, client, fake_supabase, classifier, summarizer, document_batch):
+        """The status is "processing" until the batch has stored the summary."""
+        doc_id = upload(client).get_json()["document_id"]
+        job = document_batch.submit.call_args.args[0]
+
+        response = client.get(f"/document/{doc_id}/status")
+        assert response.get_json() == {"document_id": doc_id, "status": "processing"}
+
+        document_routes.process_documents([job])
+
+        data = client.get(f"/document/{doc_id}/status").get_json()
+        assert data["status"] == "completed"
+        assert data["summary"] == "A short summary"
+        assert data["department_id"] == 7
+        assert not os.path.exists(job[1])
+
+
+class TestProcessDocuments:
+    """Test the background batch handler."""
+
+    def test_batch_whose_classifier_fails_to_load_records_failures(self, fake_supabase, summarizer):
+        """Every document of a failed batch gets a "Processing failed" row and its file is deleted."""
+        jobs = [make_job("doc-1"), make_job("doc-2")]
+
+        with patch.object(document_routes, "DocumentClassifier", side_effect=RuntimeError("spaCy model missing")):
+            document_routes.process_documents(jobs)
+
+        for doc_id, pdf_path, _, _ in jobs:
+            rows = fake_supabase.summaries(doc_id)
+            assert [row["summary_text"] for row in rows] == ["Processing failed: spaCy model missing"]
+            assert not os.path.exists(pdf_path)
+
+    def test_classify_batch_error_still_stores_summaries(self, fake_supabase, classifier, summarizer):
+        """A classification error leaves the documents without a department but with their summary."""
+        classifier.classify_batch.side_effect = RuntimeError("classifier raised")
+        job = make_job("doc-1")
+
+        document_routes.process_documents([job])
+
+        rows = fake_supabase.summaries("doc-1")
+        assert [(row["summary_text"], row["department_id"]) for row in rows] == [("A short summary", None)]
+
+    def test_only_unfinished_documents_get_failure_rows(self, fake_supabase, classifier):
+        """A document stored before the batch failed keeps its summary and gets no failure row."""
+        jobs = [make_job("doc-1"), make_job("doc-2")]
+
+        with patch.object(document_routes, "summarizer", return_value="A short summary"), \
+             patch.object(document_routes, "summary_or_message", side_effect=["First summary", RuntimeError("boom")]):
+            document_routes.process_documents(jobs)
+
+        assert [row["summary_text"] for row in fake_supabase.summaries("doc-1")] == ["First summary"]
+        assert [row["summary_text"] for row in fake_supabase.summaries("doc-2")] == ["Processing failed: boom"]
+        assert not any(os.path.exists(pdf_path) for _, pdf_path, _, _ in jobs)
+
+    def test_failed_summary_save_records_a_failure(self, fake_supabase, classifier, summarizer):
+        """When the summary row cannot be stored, a "Processing failed" row is stored instead."""
+        fake_supabase.failing_inserts = 1
+        job = make_job("doc-1")
+
+        document_routes.process_documents([job])
+
+        rows = fake_supabase.summaries("doc-1")
+        assert [row["summary_text"] for row in rows] == ["Processing failed: summary could not be saved"]
+        assert not os.path.exists(job[1])
+
+    def test_abandoned_documents_are_recorded_and_cleaned_up(self, fake_supabase):
+        """Jobs still queued at worker exit get a failure row and their files are deleted."""
+        job = make_job("doc-1")
+
+        document_routes.abandon_documents([job])
+
+        summary, = [row["summary_text"] for row in fake_supabase.summaries("doc-1")]
+        assert summary.startswith("Processing failed: the server stopped")
+        assert not os.path.exists(job[1])
+
+
+class TestReuseExistingSummary:
+    """Test copying the summary of an earlier upload with the same content."""
+
+    def add_earlier_upload(self, fake_supabase, content_hash, summary_text, department_id=7):
+        doc_id = f"earlier-{len(fake_supabase.tables['documents']) + 1}"
+        fake_supabase.tables["documents"].append({"id": doc_id, "content_hash": content_hash})
+        fake_supabase.tables["document_summaries"].append(
+            {"id": doc_id, "document_id": doc_id, "summary_text": summary_text, "department_id": department_id}
+        )
+
+    def test_reuses_summary_of_blake3_row(self, fake_supabase):
+        """An earlier upload stored with the BLAKE3 digest is matched."""
+        self.add_earlier_upload(fake_supabase, "b" * 64, "Earlier summary")
+
+        assert document_routes.reuse_existing_summary("doc-new", ["b" * 64, "s" * 64])
+
+        row, = fake_supabase.summaries("doc-new")
+        assert (row["summary_text"], row["department_id"]) == ("Earlier summary", 7)
+
+    def test_reuses_summary_of_legacy_sha256_row(self, fake_supabase):
+        """An earlier upload stored with the SHA-256 digest from before BLAKE3 is matched."""
+        self.add_earlier_upload(fake_supabase, "s" * 64, "Legacy summary", department_id=3)
+
+        assert document_routes.reuse_existing_summary("doc-new", ["b" * 64, "s" * 64])
+
+        row, = fake_supabase.summaries("doc-new")
+        assert (row["summary_text"], row["department_id"]) == ("Legacy summary", 3)
+
+    @pytest.mark.parametrize("failed_summary", [
+        "Summary generation failed: quota exceeded",
+        "Summary generation returned empty result",
+        "Processing failed: spaCy model missing",
+    ])
+    def test_failed_summaries_are_not_reused(self, fake_supabase, failed_summary):
+        """Summaries recording a failure are skipped, so the document is processed again."""
+        self.add_earlier_upload(fake_supabase, "b" * 64, failed_summary)
+
+        assert not document_routes.reuse_existing_summary("doc-new", ["b" * 64, "s" * 64])
+        assert fake_supabase.summaries("doc-new") == []
+
+    def test_failed_summary_is_skipped_for_a_good_one(self, fake_supabase):
+        """A good summary of the same content is used even when a failed one comes first."""
+        self.add_earlier_upload(fake_supabase, "b" * 64, "Processing failed: boom")
+        self.add_earlier_upload(fake_supabase, "s" * 64, "Good summary")
+
+        assert document_routes.reuse_existing_summary("doc-new", ["b" * 64, "s" * 64])
+        assert [row["summary_text"] for row in fake_supabase.summaries("doc-new")] == ["Good summary"]
+
+    def test_unknown_content_is_not_reused(self, fake_supabase):
+        """Without an earlier upload of the same content nothing is stored."""
+        self.add_earlier_upload(fake_supabase, "x" * 64, "Other document")
+
+        assert not document_routes.reuse_existing_summary("doc-new", ["b" * 64, "s" * 64])
+        assert fake_supabase.summaries("doc-new") == []
@@ -0,0 +1,83 @@
+"""
+Tests for password hashing and verification of every stored password format.
+"""
+import bcrypt
+import pytest
+from unittest.mock import patch
+from argon2 import PasswordHasher
+from utils import password
+from utils.password import hash_password, verify_password, needs_rehash
+
+
+@pytest.fixture(scope="module")
+def bcrypt_hash():
+    """A bcrypt hash of "secret123" as stored before the switch to Argon2 ($2b$)."""
+    return bcrypt.hashpw(b"secret123", bcrypt.gensalt(rounds=4)).decode("utf-8")
+
+
+class TestArgon2:
+    """Test hashes created by hash_password."""
+
+    def test_hash_is_argon2id(self):
+        """New hashes use Argon2id with the configured parameters."""
+        stored = hash_password("secret123")
+
+        assert stored.startswith("$argon2id$")
+        assert f"m={password.ARGON2_MEMORY_COST},t={password.ARGON2_TIME_COST},p=1" in stored
+
+    def test_correct_password_verifies(self):
+        assert verify_password(hash_password("secret123"), "secret123")
+
+    def test_wrong_password_does_not_verify(self):
+        assert not verify_password(hash_password("secret123"), "secret124")
+
+    def test_corrupt_argon2_hash_does_not_verify(self):
+        """A damaged stored hash is a failed login, not an error."""
+        assert not verify_password("$argon2id$v=19$m=19456,t=2,p=1$not-a-hash", "secret123")
+
+    def test_current_hash_needs_no_rehash(self):
+        assert not needs_rehash(hash_password("secret123"))
+
+    def test_hash_with_other_cost_needs_rehash(self):
+        """A hash made with different parameters is upgraded on the next login."""
+        older = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1).hash("secret123")
+
+        assert verify_password(older, "secret123")
+        assert needs_rehash(older)
+
+    def test_cost_change_marks_existing_hashes_for_rehash(self):
+        """After ARGON2_TIME_COST/ARGON2_MEMORY_COST change, hashes made before need a rehash."""
+        stored = hash_password("secret123")
+        raised = PasswordHasher(time_cost=password.ARGON2_TIME_COST + 1,
+                                memory_cost=password.ARGON2_MEMORY_COST, parallelism=1)
+
+        with patch.object(password, "_hasher", raised):
+            assert needs_rehash(stored)
+            assert verify_password(stored, "secret123")
+            assert not needs_rehash(hash_password("secret123"))
+
+    def test_invalid_argon2_hash_needs_rehash(self):
+        assert needs_rehash("$argon2id$garbage")
+
+
+class TestLegacyFormats:
+    """Test rows created before the switch to Argon2."""
+
+    @pytest.mark.parametrize("prefix", ["$2a$", "$2b$", "$2y$"])
+    def test_bcrypt_variants_verify(self, bcrypt_hash, prefix):
+        """All bcrypt prefixes verify; the variants differ only in their marker."""
+        stored = prefix + bcrypt_hash[len("$2b$"):]
+
+        assert verify_password(stored, "secret123")
+        assert not verify_password(stored, "wrong")
+
+    def test_bcrypt_needs_rehash(self, bcrypt_hash):
+        assert needs_rehash(bcrypt_hash)
+
+    def test_plain_text_verifies_exactly(self):
+        """The oldest rows hold the password itself."""
+        assert verify_password("secret123", "secret123")
+        assert not verify_password("secret123", "Secret123")
+
+    def test_plain_text_needs_rehash(self):
+        assert needs_rehash("secret123")
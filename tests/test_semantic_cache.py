@@ -0,0 +1,183 @@
+"""
+Tests for the semantic answer cache used in front of the RAG pipeline.
+"""
+import os
+import numpy as np
+import pytest
+from haystack.dataclasses import Document
+from Model_rag.semantic_cache import SemanticCache, _grounded, _sources
+
+DIMENSION = 64
+
+
+def embedding(seed):
+    return np.random.default_rng(seed).standard_normal(DIMENSION).tolist()
+
+
+def blend(base, other, weight):
+    """A vector whose cosine similarity to base falls as weight grows."""
+    return (np.asarray(base) + weight * np.asarray(other)).tolist()
+
+
+def cosine(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def chunks(*pairs):
+    return [Document(id=doc_id, content=content) for doc_id, content in pairs]
+
+
+class TestLookup:
+    """Test hits and misses on the question embedding alone."""
+
+    def test_same_embedding_is_a_hit(self):
+        """The embedding an answer was stored under finds that answer."""
+        cache = SemanticCache(threshold=0.92)
+        cache.add(embedding(1), "answer one")
+        cache.add(embedding(2), "answer two")
+
+        assert cache.lookup(embedding(1)) == "answer one"
+        assert cache.lookup(embedding(2)) == "answer two"
+
+    def test_close_paraphrase_is_a_hit(self):
+        """An embedding above the threshold reuses the answer."""
+        cache = SemanticCache(threshold=0.92)
+        cache.add(embedding(1), "answer one")
+        paraphrase = blend(embedding(1), embedding(3), 0.1)
+        assert cosine(paraphrase, embedding(1)) > 0.92
+
+        assert cache.lookup(paraphrase) == "answer one"
+
+    def test_similarity_below_threshold_is_a_miss(self):
+        """A related question below the threshold does not get the cached answer."""
+        cache = SemanticCache(threshold=0.92)
+        cache.add(embedding(1), "answer one")
+        related = blend(embedding(1), embedding(3), 0.6)
+        assert 0.5 < cosine(related, embedding(1)) < 0.92
+
+        assert cache.lookup(related) is None
+
+    def test_empty_cache_is_a_miss(self):
+        """Nothing is returned before anything was stored."""
+        assert SemanticCache().lookup(embedding(1)) is None
+
+    def test_max_size_zero_disables_the_cache(self):
+        """With max_size=0 nothing is stored."""
+        cache = SemanticCache(max_size=0)
+        cache.add(embedding(1), "answer one")
+
+        assert len(cache) == 0
+        assert cache.lookup(embedding(1)) is None
+
+
+class TestGrounding:
+    """Test that an answer is only reused for the same, unchanged retrieved chunks."""
+
+    def test_same_chunks_are_a_hit(self):
+        """The chunks the answer was generated from, retrieved again, allow the hit."""
+        cache = SemanticCache()
+        cache.add(embedding(1), "answer one", chunks(("c1", "alpha"), ("c2", "beta")))
+
+        assert cache.lookup(embedding(1), chunks(("c2", "beta"), ("c1", "alpha"))) == "answer one"
+
+    def test_changed_chunk_content_is_a_miss(self):
+        """A chunk edited since the answer was cached makes the answer stale."""
+        cache = SemanticCache()
+        cache.add(embedding(1), "answer one", chunks(("c1", "alpha"), ("c2", "beta")))
+
+        assert cache.lookup(embedding(1), chunks(("c1", "alpha"), ("c2", "beta, revised"))) is None
+
+    def test_disjoint_retrieved_chunks_are_a_miss(self):
+        """Retrieval returning other chunks than the cached ones is a miss."""
+        cache = SemanticCache()
+        cache.add(embedding(1), "answer one", chunks(("c1", "alpha"), ("c2", "beta")))
+
+        assert cache.lookup(embedding(1), chunks(("c3", "gamma"), ("c4", "delta"))) is None
+
+    def test_overlap_at_min_overlap_is_a_hit(self):
+        """Four of five chunks in common is a Jaccard overlap of exactly 0.8."""
+        cached = {f"c{i}": "h" for i in range(5)}
+        current = {f"c{i}": "h" for i in range(4)}
+
+        assert _grounded(cached, current, 0.8)
+        assert not _grounded(cached, current, 0.81)
+
+    def test_documents_on_one_side_only_are_not_grounded(self):
+        """An answer cached without sources is not served for a lookup with documents, and vice versa."""
+        current = _sources(chunks(("c1", "alpha")))
+
+        assert _grounded(None, None, 0.8)
+        assert not _grounded(None, current, 0.8)
+        assert not _grounded(current, None, 0.8)
+
+    def test_grounded_second_best_is_returned_when_best_is_stale(self):
+        """A slightly less similar entry whose chunks still match is used instead of the closest one."""
+        cache = SemanticCache(threshold=0.92)
+        cache.add(embedding(1), "stale answer", chunks(("c1", "old text")))
+        second = blend(embedding(1), embedding(3), 0.1)
+        assert cosine(second, embedding(1)) > 0.92
+        cache.add(second, "current answer", chunks(("c1", "new text")))
+
+        assert cache.lookup(embedding(1), chunks(("c1", "new text"))) == "current answer"
+        assert cache.lookup(embedding(1), chunks(("c1", "old text"))) == "stale answer"
+
+
+class TestEviction:
+    """Test least-recently-used eviction at max_size."""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """When full, the entry that was neither added nor hit most recently is replaced."""
+        cache = SemanticCache(max_size=2)
+        cache.add(embedding(1), "answer one")
+        cache.add(embedding(2), "answer two")
+        # A hit makes "answer one" the most recently used
+        assert cache.lookup(embedding(1)) == "answer one"
+
+        cache.add(embedding(3), "answer three")
+
+        assert len(cache) == 2
+        assert cache.lookup(embedding(2)) is None
+        assert cache.lookup(embedding(1)) == "answer one"
+        assert cache.lookup(embedding(3)) == "answer three"
+
+
+class TestPersistence:
+    """Test the save/load round trip."""
+
+    def test_save_then_load_restores_the_cache(self, tmp_path):
+        """A new cache on the same path has the same entries, sources and recency."""
+        path = str(tmp_path / "semantic_cache")
+        documents = [Document(id="chunk-1", content="Rolling stock maintenance schedule")]
+        cache = SemanticCache(path=path)
+        cache.add(embedding(1), "answer one", documents)
+        cache.add(embedding(2), "answer two")
+        cache.lookup(embedding(1), documents)
+        cache.save()
+
+        loaded = SemanticCache(path=path)
+
+        assert len(loaded) == len(cache)
+        assert loaded._answers == cache._answers
+        assert loaded._sources == cache._sources
+        assert loaded._last_used == cache._last_used
+        np.testing.assert_array_equal(loaded._embeddings[:len(cache)], cache._embeddings[:len(cache)])
+        np.testing.assert_array_equal(loaded._codes[:len(cache)], cache._codes[:len(cache)])
+        assert loaded.lookup(embedding(1), documents) == "answer one"
+        assert loaded.lookup(embedding(2)) == "answer two"
+
+    def test_save_replaces_the_file_without_leaving_temp_files(self, tmp_path):
+        """Saving twice leaves only the one .npz file, holding the latest entries."""
+        path = str(tmp_path / "semantic_cache")
+        cache = SemanticCache(path=path)
+        cache.add(embedding(1), "answer one")
+        cache.save()
+        cache.add(embedding(2), "answer two")
+        cache.save()
+
+        assert os.listdir(tmp_path) == ["semantic_cache.npz"]
+        assert len(SemanticCache(path=path)) == 2
+
+    def test_missing_file_starts_empty(self, tmp_path):
+        """A path without a saved cache gives an empty cache."""
+        assert len(SemanticCache(path=str(tmp_path / "missing"))) == 0
@@ -0,0 +1,118 @@
+"""
+Tests for the regex sentence splitter used when indexing documents.
+"""
+import pytest
+from haystack.dataclasses import Document
+from Model_rag.splitter import FastSentenceSplitter, split_sentences
+
+
+class TestSplitSentences:
+    """Test sentence boundaries found by split_sentences."""
+
+    @pytest.mark.parametrize("text", [
+        "",
+        "No terminator at all",
+        "One. Two! Three? ",
+        "  Leading spaces. Then\nnewlines.\n\nAnd a last fragment",
+        "Ends with dots...   And continues.",
+        "Page one.\fPage two.\f",
+    ])
+    def test_join_gives_back_the_text(self, text):
+        """Whitespace stays attached to the sentences, so nothing is lost or added."""
+        assert "".join(split_sentences(text)) == text
+
+    def test_terminators_end_sentences(self):
+        """Full stops, exclamation and question marks followed by whitespace end a sentence."""
+        assert split_sentences("Is it done? Yes! Good.") == ["Is it done? ", "Yes! ", "Good."]
+
+    def test_decimals_dates_and_urls_do_not_end_sentences(self):
+        """Terminators inside a token are not sentence ends."""
+        text = "The fare is 10.50 rupees from 01.09.2020 onwards. See www.kmrl.co.in for details."
+        assert split_sentences(text) == [
+            "The fare is 10.50 rupees from 01.09.2020 onwards. ",
+            "See www.kmrl.co.in for details.",
+        ]
+
+    def test_abbreviations_do_not_end_sentences(self):
+        """Common abbreviations in the SOPs keep their sentence together."""
+        text = "Refer Tender No. 5/2023 approved by Dr. Rao. Pay Rs. 500 as EMD."
+        assert split_sentences(text) == [
+            "Refer Tender No. 5/2023 approved by Dr. Rao. ",
+            "Pay Rs. 500 as EMD.",
+        ]
+
+    def test_initials_and_dotted_abbreviations_do_not_end_sentences(self):
+        """Initials, case numbers and "i.e." are not sentence ends."""
+        text = "Filed by A. K. Menon as W.P. 123/2020, i.e. before the order. Hearing is next week."
+        assert split_sentences(text) == [
+            "Filed by A. K. Menon as W.P. 123/2020, i.e. before the order. ",
+            "Hearing is next week.",
+        ]
+
+    def test_abbreviation_check_ignores_case_and_brackets(self):
+        """"NO." and "(Ref." are recognised like "No." and "Ref."."""
+        text = "Circular NO. 12 (Ref. letter dated 3.4.2024) is withdrawn. Comply at once."
+        assert split_sentences(text) == [
+            "Circular NO. 12 (Ref. letter dated 3.4.2024) is withdrawn. ",
+            "Comply at once.",
+        ]
+
+
+def split(content, split_length, split_overlap, meta=None):
+    splitter = FastSentenceSplitter(split_length=split_length, split_overlap=split_overlap)
+    return splitter.run(documents=[Document(id="parent", content=content, meta=meta or {})])["documents"]
+
+
+class TestFastSentenceSplitter:
+    """Test the overlapping windows and their metadata."""
+
+    def test_windows_overlap_and_stop_at_the_end(self):
+        """Seven sentences in windows of 3 overlapping by 1 start at 0, 2 and 4; no window of only overlap follows."""
+        content = "S0. S1. S2. S3. S4. S5. S6."
+        docs = split(content, split_length=3, split_overlap=1)
+
+        assert [doc.content for doc in docs] == ["S0. S1. S2. ", "S2. S3. S4. ", "S4. S5. S6."]
+        assert [doc.meta["split_id"] for doc in docs] == [0, 1, 2]
+        assert [doc.meta["split_idx_start"] for doc in docs] == [0, 8, 16]
+        assert all(content[doc.meta["split_idx_start"]:].startswith(doc.content) for doc in docs)
+
+    def test_last_window_can_be_shorter(self):
+        """Six sentences in windows of 3 overlapping by 1 end with a two-sentence window."""
+        docs = split("S0. S1. S2. S3. S4. S5.", split_length=3, split_overlap=1)
+
+        assert [doc.content for doc in docs] == ["S0. S1. S2. ", "S2. S3. S4. ", "S4. S5."]
+
+    def test_text_shorter_than_a_window_is_one_split(self):
+        """Fewer sentences than split_length give a single split with the whole text."""
+        docs = split("Only. Two.", split_length=6, split_overlap=2)
+
+        assert [doc.content for doc in docs] == ["Only. Two."]
+
+    def test_without_overlap_every_sentence_is_in_one_split(self):
+        """With split_overlap=0 the splits partition the text."""
+        content = "A one. B two. C three. D four. E five."
+        docs = split(content, split_length=2, split_overlap=0)
+
+        assert "".join(doc.content for doc in docs) == content
+        assert len(docs) == 3
+
+    def test_meta_is_carried_with_source_and_page_number(self):
+        """Each split keeps the parent's meta and records its source and starting page."""
+        content = "Page one. Still one.\fPage two. More two.\fPage three."
+        docs = split(content, split_length=2, split_overlap=0, meta={"file_path": "sop.pdf"})
+
+        assert [doc.meta["page_number"] for doc in docs] == [1, 2, 3]
+        assert all(doc.meta["source_id"] == "parent" for doc in docs)
+        assert all(doc.meta["file_path"] == "sop.pdf" for doc in docs)
+
+    def test_invalid_window_settings_are_rejected(self):
+        """split_length must be positive and larger than split_overlap."""
+        with pytest.raises(ValueError):
+            FastSentenceSplitter(split_length=0)
+        with pytest.raises(ValueError):
+            FastSentenceSplitter(split_length=2, split_overlap=2)
+
+    def test_document_without_content_is_rejected(self):
+        """A document with no content cannot be split."""
+        with pytest.raises(ValueError):
+            FastSentenceSplitter().run(documents=[Document(id="empty", content=None)])
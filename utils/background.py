@@ -0,0 +1,151 @@
+import os
+import time
+import atexit
+import itertools
+import traceback
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Document conversion, OCR, translation and classification are CPU-heavy; every request
+# thread of a worker shares these few threads instead of running them all at once
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", "2"))
+# Uploads classified together: at most DOCUMENT_BATCH_SIZE per batch, waiting at most
+# DOCUMENT_BATCH_WAIT_MS for the batch to fill
+DOCUMENT_BATCH_SIZE = int(os.getenv("DOCUMENT_BATCH_SIZE", "8"))
+DOCUMENT_BATCH_WAIT_MS = float(os.getenv("DOCUMENT_BATCH_WAIT_MS", "500"))
+# Batches run on their own threads, never on the document pool: a slow batch (Gemini summaries)
+# must not hold up the uploads and translations that wait on document_pool()
+DOCUMENT_BATCH_WORKERS = int(os.getenv("DOCUMENT_BATCH_WORKERS", "1"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _reset():
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+# Threads do not survive fork (gunicorn preload_app); each worker starts its own pool
+os.register_at_fork(after_in_child=_reset)
+
+def document_pool():
+    """
+    Get the process-wide pool for heavy document work
+
+    Returns:
+        ThreadPoolExecutor: Pool with DOCUMENT_WORKERS threads, created on first use
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=DOCUMENT_WORKERS, thread_name_prefix="documents")
+    return _pool
+
+def run_document_job(fn, *args, **kwargs):
+    """
+    Run heavy document work on the shared pool and wait for its result
+
+    Args:
+        fn (callable): Function to run
+        *args, **kwargs: Arguments for fn
+
+    Returns:
+        The return value of fn; its exception is re-raised here
+    """
+    return document_pool().submit(fn, *args, **kwargs).result()
+
+class BatchQueue:
+    """
+    Hands items submitted from request threads to `handler` in batches on its own threads
+
+    The first item starts a batch; items arriving within `max_wait_ms` (up to `max_batch_size`)
+    join it. Uploads that arrive together are then classified in one spaCy pass instead of
+    one by one. `handler` receives a list of items and returns nothing; it should record
+    per-item failures itself, exceptions that escape it are only logged.
+
+    The queue is in-process memory, not durable storage. Batches already handed to the
+    executor finish before the interpreter exits; items not yet handed to `handler` are
+    passed to `abandon` (a list, like `handler`) by an exit handler instead. If the process
+    is killed without running exit handlers, those items are lost.
+    """
+    def __init__(self, handler, max_batch_size=DOCUMENT_BATCH_SIZE, max_wait_ms=DOCUMENT_BATCH_WAIT_MS,
+                 workers=DOCUMENT_BATCH_WORKERS, abandon=None):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.workers = workers
+        self.abandon = abandon
+        self._reset()
+        # Threads do not survive fork (gunicorn preload_app); start a new collector in the child
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self._abandon_pending)
+
+    def _reset(self):
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._executor = None
+        # Items submitted but not yet handed to handler, by submission number
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._tokens = itertools.count()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="document-batch")
+                    self._worker = threading.Thread(target=self._collect, name="document-batches", daemon=True)
+                    self._worker.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, entries):
+        with self._pending_lock:
+            for token, _ in entries:
+                self._pending.pop(token, None)
+        batch = [item for _, item in entries]
+        # Nothing waits on the batch's future, so an exception would otherwise vanish with it
+        try:
+            self.handler(batch)
+        except Exception:
+            print(f"Batch of {len(batch)} failed in {getattr(self.handler, '__name__', self.handler)}:")
+            traceback.print_exc()
+
+    def _collect(self):
+        while True:
+            self._executor.submit(self._run, self._next_batch())
+
+    def _abandon_pending(self):
+        # Runs at exit, after the executor's threads have finished the batches given to them
+        with self._pending_lock:
+            items = list(self._pending.values())
+            self._pending.clear()
+        if items and self.abandon is not None:
+            self.abandon(items)
+
+    def submit(self, item):
+        """
+        Queue an item for the next batch
+
+        Args:
+            item: Anything `handler` accepts in its list
+        """
+        self._ensure_worker()
+        token = next(self._tokens)
+        with self._pending_lock:
+            self._pending[token] = item
+        self._queue.put((token, item))
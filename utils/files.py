@@ -0,0 +1,110 @@
+import re
+import hashlib
+import os
+import mimetypes
+from functools import lru_cache
+from blake3 import blake3
+
+# Anything outside these chars is replaced in storage names
+UNSAFE_FILENAME_PATTERN = re.compile(r'[^a-zA-Z0-9_\-\.]')
+
+# Files at least this large are memory-mapped and hashed on several threads. BLAKE3 is a
+# tree hash, so the digest is the same whether one thread or many compute it.
+PARALLEL_HASH_MIN_BYTES = 4 << 20
+
+def calculate_file_hash(file):
+    """
+    Hash a file's contents for the documents.content_hash column
+
+    content_hash only identifies duplicates, so it uses BLAKE3 (SIMD, several times
+    faster than SHA-256). Rows stored before the switch hold SHA-256 digests, which never
+    equal a BLAKE3 one: uploads use calculate_file_hashes() so those rows still count.
+
+    Args:
+        file: Binary file object; files opened from disk are hashed whole, other
+            streams from their current position
+
+    Returns:
+        str: 64-character hex digest; the file is rewound to the start
+    """
+    path = getattr(file, "name", None)
+    if isinstance(path, str) and os.path.isfile(path) and os.path.getsize(path) >= PARALLEL_HASH_MIN_BYTES:
+        digest = blake3(max_threads=blake3.AUTO)
+        digest.update_mmap(path)
+    elif hasattr(hashlib, "file_digest"):
+        # Python 3.11+: the file is read in large blocks without a Python-level loop
+        digest = hashlib.file_digest(file, blake3)
+    else:
+        digest = blake3()
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+def calculate_file_hashes(file):
+    """
+    Hash a file's contents with BLAKE3 and with SHA-256 in one read
+
+    The SHA-256 digest is how content_hash was computed before BLAKE3. It is passed to
+    publish_document as p_legacy_hash, so an upload matching a row stored before the switch
+    is still detected as a duplicate. Both hashers are fed from the same blocks, so the
+    file is read once, as with calculate_file_hash.
+
+    Remove this (and p_legacy_hash) once no documents row stored before the BLAKE3
+    switch is left with its SHA-256 content_hash, i.e. after those rows are rehashed or deleted.
+
+    Args:
+        file: Binary file object, read from its current position
+
+    Returns:
+        tuple[str, str]: BLAKE3 and SHA-256 hex digests; the file is rewound to the start
+    """
+    digest = blake3(max_threads=blake3.AUTO)
+    legacy = hashlib.sha256()
+    block = bytearray(1 << 20)
+    view = memoryview(block)
+    while True:
+        size = file.readinto(block)
+        if not size:
+            break
+        digest.update(view[:size])
+        legacy.update(view[:size])
+    file.seek(0)
+    return digest.hexdigest(), legacy.hexdigest()
+
+def sanitize_filename(filename):
+    """
+    Keep only safe chars for storage
+
+    Args:
+        filename (str): Title or file name supplied by the client
+
+    Returns:
+        str: Name with every other character replaced by an underscore
+    """
+    return UNSAFE_FILENAME_PATTERN.sub('_', filename)
+
+@lru_cache(maxsize=4096)
+def _guess_type(extension):
+    # mimetypes only looks at the extension, so the answer is cached per extension
+    return mimetypes.guess_type("file" + extension)[0]
+
+def is_pdf_file(file):
+    """
+    Check if the file is already a PDF
+
+    The first bytes decide, so a PDF with a wrong or missing extension is not sent through
+    convert_to_pdf; otherwise the file name's extension does.
+
+    Args:
+        file (FileStorage): Uploaded file
+
+    Returns:
+        bool: True if the file starts with the PDF signature or has a PDF extension
+    """
+    position = file.stream.tell()
+    head = file.stream.read(5)
+    file.stream.seek(position)
+    if head == b"%PDF-":
+        return True
+    return _guess_type(os.path.splitext(file.filename or "")[1].lower()) == 'application/pdf'
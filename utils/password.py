@@ -0,0 +1,78 @@
+import os
+import threading
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError, VerificationError, InvalidHashError
+
+# Argon2id with the OWASP baseline parameters (19 MiB, 2 passes) by default: about as strong
+# as bcrypt cost 12 against offline attacks, at a fraction of its CPU time per login.
+# Revisit the cost as hardware gets faster; after a change, needs_rehash() upgrades stored
+# hashes on their next login.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "19456"))  # KiB
+_hasher = PasswordHasher(time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST, parallelism=1)
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+# argon2-cffi and bcrypt release the GIL while hashing, so gthread workers already keep
+# serving other requests during a login; this caps how many hashes one worker runs at once
+# so a burst of logins cannot take every core (and 19 MiB each) away from the other workers
+_HASH_SLOTS = threading.BoundedSemaphore(int(os.getenv("PASSWORD_HASH_CONCURRENCY", "2")))
+
+def hash_password(password):
+    """
+    Hash a password for storage
+
+    Args:
+        password (str): Plain-text password
+
+    Returns:
+        str: Argon2id hash in PHC string format
+    """
+    with _HASH_SLOTS:
+        return _hasher.hash(password)
+
+def verify_password(stored_password, password):
+    """
+    Check a password against the stored value
+
+    Argon2 hashes are verified directly; rows created before the switch keep
+    their bcrypt hashes (or, for the oldest rows, plain text) and still verify.
+
+    Args:
+        stored_password (str): Value of the users.password column
+        password (str): Password supplied at login
+
+    Returns:
+        bool: True if the password matches
+    """
+    if stored_password.startswith("$argon2"):
+        try:
+            with _HASH_SLOTS:
+                return _hasher.verify(stored_password, password)
+        except (VerifyMismatchError, VerificationError, InvalidHashError):
+            return False
+    if stored_password.startswith(BCRYPT_PREFIXES):
+        with _HASH_SLOTS:
+            return bcrypt.checkpw(password.encode("utf-8"), stored_password.encode("utf-8"))
+    return password == stored_password
+
+def needs_rehash(stored_password):
+    """
+    Check whether a stored value should be replaced with a fresh hash
+
+    True for bcrypt and plain-text rows, and for Argon2 hashes made with
+    parameters other than the current ones.
+
+    Args:
+        stored_password (str): Value of the users.password column
+
+    Returns:
+        bool: True if the password should be rehashed after a successful login
+    """
+    if not stored_password.startswith("$argon2"):
+        return True
+    try:
+        return _hasher.check_needs_rehash(stored_password)
+    except InvalidHashError:
+        return True